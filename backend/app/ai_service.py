@@ -5,6 +5,7 @@ Falls back to predefined names if Groq is unavailable.
 import random
 from typing import Optional
 from .config import get_settings
+from .metrics import OUTBOUND_HTTP_SECONDS, timed
 
 # Predefined fallback names by family and level
 FALLBACK_NAMES = {
@@ -88,7 +89,7 @@ async def _groq_generate_name(family: str, level: int, lang: str, api_key: str)
             f"Just the name, nothing else."
         )
 
-        async with httpx.AsyncClient(timeout=3.0) as client:
+        async with httpx.AsyncClient(timeout=3.0) as client, timed(OUTBOUND_HTTP_SECONDS, "groq"):
             resp = await client.post(
                 "https://api.groq.com/openai/v1/chat/completions",
                 headers={
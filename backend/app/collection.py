@@ -0,0 +1,173 @@
+"""
+Bestiary (discoveredCreatures) as a family×level matrix.
+
+Each creature (family, level) has its compiled index k from game_data. A
+Collection keeps a discovery bitmask (bit k set ⇔ discovered) plus
+totalMerged / discoveredAt arrays indexed by k, so discovering, counting
+and "has X" checks are O(1) and nothing is scanned or copied per action.
+
+k depends on the catalog's order, so stored blobs don't use it: they carry
+the compact form under "collection" keyed by family id, with bit L - 1 of a
+family's mask ⇔ level L discovered:
+
+    {"fairy_cat": {"mask": 7, "merged": [...], "at": [...]}, ...}
+
+with each family's arrays cut after its highest discovered level. Adding
+levels or families later leaves stored bestiaries as they were. Blobs from
+before this layout (one hex mask over k) are read against the catalog order
+they were written with, _V1_ORDER.
+
+The frontend keeps the old discoveredCreatures list; expand_state() /
+compact_state() convert at the API boundary (responses out, client saves in).
+"""
+from typing import Optional
+
+from .game_data import CREATURE_INDEX
+
+SIZE = len(CREATURE_INDEX)
+_KEYS = [None] * SIZE          # k → (family, level)
+_FAMILY_BITS = {}              # family → (first k, mask of its levels from there)
+_FAMILY_LEVELS = {}            # family → ((level, k), ...) in level order
+for _key, _k in CREATURE_INDEX.items():
+    _KEYS[_k] = _key
+    _first, _bits = _FAMILY_BITS.get(_key[0], (_k, 0))
+    _FAMILY_BITS[_key[0]] = (_first, _bits << 1 | 1)
+    _FAMILY_LEVELS[_key[0]] = _FAMILY_LEVELS.get(_key[0], ()) + ((_key[1], _k),)
+del _key, _k, _first, _bits
+
+# The catalog when blobs stored a single mask over k; never change this
+_V1_ORDER = tuple(
+    (family, level)
+    for family in ("fairy_cat", "baby_dragon", "mini_unicorn", "forest_fox", "mushroom_sprite")
+    for level in range(1, 6)
+)
+
+
+class Collection:
+    __slots__ = ("mask", "merged", "at")
+
+    def __init__(self):
+        self.mask = 0
+        self.merged = [0] * SIZE
+        self.at = [0] * SIZE
+
+    # ─── Load / dump ──────────────────────────────────────────────────────────
+    @classmethod
+    def from_list(cls, entries: list[dict]) -> "Collection":
+        """From the discoveredCreatures list. Unknown creatures are dropped; duplicates keep the first entry."""
+        c = cls()
+        for e in entries:
+            k = CREATURE_INDEX.get((e.get("family"), e.get("level")))
+            if k is None or c.mask >> k & 1:
+                continue
+            c.mask |= 1 << k
+            c.at[k] = e.get("discoveredAt", 0)
+            c.merged[k] = e.get("totalMerged", 0)
+        return c
+
+    @classmethod
+    def from_compact(cls, data: dict) -> "Collection":
+        """From the stored form. Creatures no longer in the catalog are dropped."""
+        if isinstance(data.get("mask"), str):
+            return cls._from_v1(data)
+        c = cls()
+        for family, entry in data.items():
+            mask, merged, at = entry.get("mask", 0), entry.get("merged", ()), entry.get("at", ())
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                i = low.bit_length() - 1
+                k = CREATURE_INDEX.get((family, i + 1))
+                if k is None:
+                    continue
+                c.mask |= 1 << k
+                c.merged[k] = merged[i] if i < len(merged) else 0
+                c.at[k] = at[i] if i < len(at) else 0
+        return c
+
+    @classmethod
+    def _from_v1(cls, data: dict) -> "Collection":
+        c = cls()
+        mask = int(data.get("mask") or "0", 16)
+        merged, at = data.get("merged", ()), data.get("at", ())
+        for i, key in enumerate(_V1_ORDER):
+            k = CREATURE_INDEX.get(key)
+            if k is None or not mask >> i & 1:
+                continue
+            c.mask |= 1 << k
+            c.merged[k] = merged[i] if i < len(merged) else 0
+            c.at[k] = at[i] if i < len(at) else 0
+        return c
+
+    def to_compact(self) -> dict:
+        compact = {}
+        for family, (first, bits) in _FAMILY_BITS.items():
+            if not self.mask >> first & bits:
+                continue
+            found = [(level, k) for level, k in _FAMILY_LEVELS[family] if self.mask >> k & 1]
+            top = found[-1][0]
+            mask, merged, at = 0, [0] * top, [0] * top
+            for level, k in found:
+                mask |= 1 << (level - 1)
+                merged[level - 1] = self.merged[k]
+                at[level - 1] = self.at[k]
+            compact[family] = {"mask": mask, "merged": merged, "at": at}
+        return compact
+
+    def to_list(self) -> list[dict]:
+        """discoveredCreatures, oldest discovery first."""
+        ks = sorted(self._ks(), key=lambda k: (self.at[k], k))
+        return [
+            {"family": _KEYS[k][0], "level": _KEYS[k][1], "discoveredAt": self.at[k], "totalMerged": self.merged[k]}
+            for k in ks
+        ]
+
+    def _ks(self):
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    # ─── Queries / updates ────────────────────────────────────────────────────
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def has(self, family: str, level: int) -> bool:
+        k = CREATURE_INDEX.get((family, level))
+        return k is not None and bool(self.mask >> k & 1)
+
+    def highest_level(self, family: str) -> int:
+        """Highest level discovered in a family, 0 if none."""
+        first, bits = _FAMILY_BITS.get(family, (0, 0))
+        return (self.mask >> first & bits).bit_length()
+
+    def discover(self, family: str, level: int, now_ms: int, merged: int = 0) -> Optional[int]:
+        """Record a creature, bumping totalMerged if already known. Returns k (None if unknown)."""
+        k = CREATURE_INDEX.get((family, level))
+        if k is None:
+            return None
+        if not self.mask >> k & 1:
+            self.mask |= 1 << k
+            self.at[k] = now_ms
+        self.merged[k] += merged
+        return k
+
+
+# ─── API boundary ─────────────────────────────────────────────────────────────
+def expand_state(state: dict) -> dict:
+    """Stored shape → API shape: "collection" becomes the discoveredCreatures list."""
+    if "collection" not in state:
+        return state
+    state = dict(state)
+    state["discoveredCreatures"] = Collection.from_compact(state.pop("collection")).to_list()
+    return state
+
+
+def compact_state(state: dict) -> dict:
+    """API shape → stored shape: the discoveredCreatures list becomes "collection"."""
+    if "discoveredCreatures" not in state:
+        return state
+    state = dict(state)
+    state["collection"] = Collection.from_list(state.pop("discoveredCreatures") or []).to_compact()
+    return state
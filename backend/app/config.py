@@ -1,12 +1,32 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
+
+# Committed to the repo, so only good enough for local development
+DEV_SECRET_KEY = "dev_secret_change_in_production_minimum_32_chars"
 
 
 class Settings(BaseSettings):
     telegram_bot_token: str = ""
     telegram_bot_username: str = "EnchantedPawsBot"
-    secret_key: str = "dev_secret_change_in_production_minimum_32_chars"
+    secret_key: str = DEV_SECRET_KEY
+    session_token_ttl_sec: int = 3600
     database_url: str = "sqlite:///./enchanted_paws.db"
+    db_profile: str = "auto"            # auto | default | production
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30           # seconds
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+    save_coalescing: bool = True        # write-behind buffer for /game/save
+    save_flush_interval_sec: float = 2.0
+    save_flush_batch_size: int = 200
+    json_engine: str = "auto"           # auto | orjson | json
+    state_codec: str = "zlib"           # zlib | zstd | json
+    state_zstd_dict_path: str = ""      # optional trained zstd dictionary
+    metrics_enabled: Optional[bool] = None  # /api/metrics and the request/SQL instrumentation; see metrics_on()
+    metrics_token: str = ""             # if set, /api/metrics requires "Authorization: Bearer <token>"
     frontend_url: str = "http://localhost:5173"
     groq_api_key: str = ""
     payment_provider_token: str = ""
@@ -20,3 +40,24 @@ class Settings(BaseSettings):
 @lru_cache
 def get_settings() -> Settings:
     return Settings()
+
+
+def session_secret(s: Settings) -> str:
+    """
+    Key for signing session tokens, or "" when tokens are disabled: outside
+    development the public default key would let anyone mint them, so
+    clients stay on initData until SECRET_KEY is set.
+    """
+    if s.secret_key == DEV_SECRET_KEY and s.environment != "development":
+        return ""
+    return s.secret_key
+
+
+def metrics_on(s: Settings) -> bool:
+    """
+    Whether to instrument and serve /api/metrics. Unset, it is on in
+    development and, elsewhere, only with a METRICS_TOKEN to protect it.
+    """
+    if s.metrics_enabled is not None:
+        return s.metrics_enabled
+    return s.environment == "development" or bool(s.metrics_token)
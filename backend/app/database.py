@@ -1,16 +1,85 @@
-from sqlalchemy import create_engine
+from sqlalchemy import LargeBinary, create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from .config import get_settings
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from .config import get_settings, Settings
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
-    echo=settings.debug,
-)
+
+# ─── Profiles ─────────────────────────────────────────────────────────────────
+def resolve_db_profile(s: Settings) -> str:
+    """'auto' picks the tuned profile everywhere except development."""
+    if s.db_profile == "auto":
+        return "default" if s.environment == "development" else "production"
+    return s.db_profile
+
+
+def sqlite_pragmas(s: Settings) -> dict:
+    """PRAGMAs applied to every new SQLite connection in the production profile."""
+    return {
+        "journal_mode": "WAL",              # readers no longer block on the writer
+        "synchronous": "NORMAL",            # fsync at checkpoints only; safe with WAL
+        "mmap_size": s.sqlite_mmap_size,
+        "cache_size": -s.sqlite_cache_size_kb,  # negative = KiB
+        "busy_timeout": s.sqlite_busy_timeout_ms,
+        "temp_store": "MEMORY",
+    }
+
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver (URLs naming a driver pass through)."""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def make_engine(s: Settings, profile: str = None, use_async: bool = False):
+    profile = profile or resolve_db_profile(s)
+    url = async_database_url(s.database_url) if use_async else s.database_url
+    is_sqlite = s.database_url.startswith("sqlite")
+    is_memory = is_sqlite and (":memory:" in s.database_url or s.database_url == "sqlite://")
+
+    kwargs = {
+        "connect_args": {"check_same_thread": False} if is_sqlite else {},
+        "echo": s.debug and s.environment == "development",
+    }
+    if not is_memory:
+        kwargs.update(
+            pool_size=s.db_pool_size,
+            max_overflow=s.db_max_overflow,
+            pool_timeout=s.db_pool_timeout,
+            pool_pre_ping=not is_sqlite,
+        )
+        if use_async and is_sqlite:
+            # aiosqlite defaults to NullPool — reopening the file on every request
+            kwargs["poolclass"] = AsyncAdaptedQueuePool
+    eng = create_async_engine(url, **kwargs) if use_async else create_engine(url, **kwargs)
+
+    if is_sqlite and profile == "production":
+        pragmas = sqlite_pragmas(s)
+
+        @event.listens_for(eng.sync_engine if use_async else eng, "connect")
+        def _apply_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            for name, value in pragmas.items():
+                cur.execute(f"PRAGMA {name}={value}")
+            cur.close()
+
+    return eng
+
+
+engine = make_engine(settings)
+async_engine = make_engine(settings, use_async=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -25,6 +94,36 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Columns added after their table first shipped; create_all() only creates
+# missing tables, so these are added to existing databases by hand.
+_ADDED_COLUMNS = {
+    "users": {"state_version": "INTEGER NOT NULL DEFAULT 0"},
+}
+
+
 def init_db():
     from . import models  # noqa: F401
     Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+        # game_state went from TEXT to binary with the state codec. SQLite
+        # stores either in the old column; PostgreSQL needs it converted, and
+        # legacy JSON text becomes its UTF-8 bytes, which decode_state() reads
+        if engine.dialect.name == "postgresql":
+            column = next(c for c in inspector.get_columns("users") if c["name"] == "game_state")
+            if not isinstance(column["type"], LargeBinary):
+                conn.execute(text(
+                    "ALTER TABLE users ALTER COLUMN game_state TYPE bytea USING convert_to(game_state, 'UTF8')"
+                ))
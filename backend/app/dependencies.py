@@ -0,0 +1,85 @@
+"""
+Shared FastAPI dependencies.
+"""
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+
+from .config import get_settings, session_secret
+from .database import get_db, get_async_db
+from .models import User
+from .telegram_auth import resolve_identity
+
+settings = get_settings()
+
+# Always loaded so the identity check and later lookups never trigger a refresh
+_IDENTITY_COLUMNS = (User.id, User.telegram_id)
+
+
+def _identify(request: Request) -> dict:
+    allow_dev = not settings.telegram_bot_token or settings.environment == "development"
+    return resolve_identity(request, settings.telegram_bot_token, session_secret(settings), allow_dev=allow_dev)
+
+
+def _check_user(user, identity: dict) -> User:
+    if user and user.telegram_id != identity["telegram_id"]:
+        user = None
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found. Auth first.")
+    return user
+
+
+def current_user(*columns):
+    """
+    Dependency factory resolving the calling user once per request.
+
+    Pass the User columns a route actually reads, e.g.
+    ``Depends(current_user(User.subscription))``; anything else (notably the
+    large ``game_state`` blob) is deferred and only loaded if touched.
+    With no columns the whole row is loaded.
+    """
+    options = [load_only(*_IDENTITY_COLUMNS, *columns)] if columns else []
+
+    def dependency(request: Request, db: Session = Depends(get_db)) -> User:
+        user = getattr(request.state, "current_user", None)
+        if user is not None:
+            return user
+
+        identity = _identify(request)
+        if identity["user_id"] is not None:
+            user = db.get(User, identity["user_id"], options=options)
+        else:
+            user = db.query(User).options(*options).filter(User.telegram_id == identity["telegram_id"]).first()
+
+        request.state.current_user = _check_user(user, identity)
+        return request.state.current_user
+
+    return dependency
+
+
+def current_user_async(*columns):
+    """
+    Same as current_user() but on the AsyncSession from get_async_db.
+
+    Deferred columns cannot lazy-load under asyncio, so a projected route
+    must list every column it touches.
+    """
+    options = [load_only(*_IDENTITY_COLUMNS, *columns)] if columns else []
+
+    async def dependency(request: Request, db: AsyncSession = Depends(get_async_db)) -> User:
+        user = getattr(request.state, "current_user_async", None)
+        if user is not None:
+            return user
+
+        identity = _identify(request)
+        if identity["user_id"] is not None:
+            user = await db.get(User, identity["user_id"], options=options)
+        else:
+            stmt = select(User).options(*options).where(User.telegram_id == identity["telegram_id"])
+            user = (await db.execute(stmt)).scalars().first()
+
+        request.state.current_user_async = _check_user(user, identity)
+        return request.state.current_user_async
+
+    return dependency
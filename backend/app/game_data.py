@@ -60,6 +60,7 @@ MAX_LEVEL = 5
 MAX_GRID_SIZE = 40
 DEFAULT_UNLOCKED_SLOTS = 15
 MAX_OFFLINE_HOURS = 8
+MAX_BATCH_ACTIONS = 100   # per /game/actions request
 
 SHOP_ITEMS = {
     "buy_fairy_cat_1":    {"category": "creature", "cost": {"leaves": 0},  "creature_family": "fairy_cat",       "creature_level": 1},
@@ -67,7 +68,7 @@ SHOP_ITEMS = {
     "buy_unicorn_1":      {"category": "creature", "cost": {"leaves": 20}, "creature_family": "mini_unicorn",    "creature_level": 1},
     "buy_dragon_1":       {"category": "creature", "cost": {"leaves": 30}, "creature_family": "baby_dragon",     "creature_level": 1},
     "buy_fox_1":          {"category": "creature", "cost": {"leaves": 50, "dew": 5}, "creature_family": "forest_fox", "creature_level": 1},
-    "boost_2x_60":        {"category": "booster",  "cost": {"dew": 50},   "effect": "2x_production_60min"},
+    "boost_2x_60":        {"category": "booster",  "cost": {"dew": 50},   "effect": "2x_production_60min", "multiplier": 2.0, "duration_min": 60},
     "extra_slots_5":      {"category": "slot",     "cost_stars": 50,       "slots": 5},
     "no_ads":             {"category": "cosmetic", "cost_stars": 75},
     "cosmetic_pack_moon": {"category": "cosmetic", "cost_stars": 100},
@@ -85,6 +86,22 @@ SUBSCRIPTION_PRICES = {
     "enchanted": 500,
 }
 
+SUBSCRIPTION_DURATION_MS = 30 * 24 * 3600 * 1000
+
+# Server-wide production events: {"name", "start_ms", "end_ms", "multiplier"}.
+# They stack multiplicatively with subscriptions and boosters.
+GLOBAL_EVENTS: list[dict] = []
+
+# Building passives applied to each collection, in the order they were built
+BUILDING_BONUSES = {
+    "cozy_cottage":  {"mult": {"leaves": 1.10}},
+    "crystal_tower": {"mult": {"dew": 1.15}},
+    "mushroom_hut":  {"add": {"leaves": 1, "dew": 1}},
+}
+
+# Bump when QUEST_TEMPLATES changes so daily quests are re-derived from the new set
+QUEST_TEMPLATE_VERSION = 1
+
 QUEST_TEMPLATES = [
     {"type": "merge",        "target_amount": 3,   "reward_leaves": 50,  "reward_dew": 5,  "reward_berries": 0},
     {"type": "merge",        "target_amount": 5,   "reward_leaves": 80,  "reward_dew": 8,  "reward_berries": 0},
@@ -97,12 +114,61 @@ QUEST_TEMPLATES = [
 
 
 def get_creature_def(family: str, level: int) -> dict:
-    levels = CREATURE_FAMILIES.get(family, {}).get("levels", [])
-    for lvl in levels:
-        if lvl["level"] == level:
-            return lvl
-    raise ValueError(f"Unknown creature: {family} L{level}")
+    k = CREATURE_INDEX.get((family, level))
+    if k is None:
+        raise ValueError(f"Unknown creature: {family} L{level}")
+    return CREATURE_DEFS[k]
+
+
+def get_building_effect(def_id: str) -> Optional[tuple[tuple, tuple]]:
+    return BUILDING_EFFECTS.get(def_id)
 
 
 def get_subscription_multiplier(tier: str) -> float:
     return SUBSCRIPTION_BENEFITS.get(tier, {}).get("multiplier", 1.0)
+
+
+# ─── Compiled tables ──────────────────────────────────────────────────────────
+# Built once at import so lookups don't walk the dicts above. Every creature
+# (family, level) gets a flat index k; per-creature data lives in parallel
+# tuples indexed by k, with resource amounts as vectors in RESOURCES order.
+# The dicts above stay the source of truth and get_creature_def() still
+# returns their level dicts.
+RESOURCES = ("leaves", "dew", "berries")
+
+
+def _vector(amounts: dict, default=0) -> tuple:
+    return tuple(amounts.get(r, default) for r in RESOURCES)
+
+
+FAMILY_IDS = tuple(CREATURE_FAMILIES)
+FAMILY_INDEX = {fam: i for i, fam in enumerate(FAMILY_IDS)}
+
+CREATURE_INDEX: dict[tuple[str, int], int] = {}
+_defs, _production, _intervals = [], [], []
+for _fam in FAMILY_IDS:
+    for _lvl in CREATURE_FAMILIES[_fam]["levels"]:
+        CREATURE_INDEX[(_fam, _lvl["level"])] = len(_defs)
+        _defs.append(_lvl)
+        _production.append(_vector(_lvl["production"]))
+        _intervals.append(_lvl["interval_sec"])
+
+CREATURE_DEFS = tuple(_defs)
+PRODUCTION = tuple(_production)     # k → (leaves, dew, berries) per tick
+INTERVAL_SEC = tuple(_intervals)    # k → seconds per tick
+del _fam, _lvl, _defs, _production, _intervals
+
+# Creatures with the same tick length tick together, so production can be
+# summed per interval class
+INTERVAL_CLASSES = tuple(sorted(set(INTERVAL_SEC)))                   # class → seconds per tick
+INTERVAL_CLASS = tuple(INTERVAL_CLASSES.index(s) for s in INTERVAL_SEC)  # k → class
+
+# defId → (multiplier vector, flat bonus vector)
+BUILDING_EFFECTS = {
+    def_id: (_vector(b.get("mult", {}), 1.0), _vector(b.get("add", {})))
+    for def_id, b in BUILDING_BONUSES.items()
+}
+
+# item_id → cost vector, and the list served by /shop/items
+SHOP_COSTS = {item_id: _vector(item.get("cost", {})) for item_id, item in SHOP_ITEMS.items()}
+SHOP_CATALOG = tuple({"id": item_id, **item} for item_id, item in SHOP_ITEMS.items())
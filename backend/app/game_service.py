@@ -1,24 +1,28 @@
 """
-Core game logic — operates on game_state dicts, no DB access.
+Core game logic — operates on GameState objects, no DB access.
+
+Actions accept a GameState (or a plain state dict, which is wrapped), mutate
+it in place and return it alongside their result.
 """
-import json
 import time
+import hashlib
 import random
 import string
-from typing import Optional
+from typing import Optional, Union
 from .game_data import (
-    CREATURE_FAMILIES, MAX_LEVEL, MAX_GRID_SIZE, DEFAULT_UNLOCKED_SLOTS,
-    MAX_OFFLINE_HOURS, QUEST_TEMPLATES, get_creature_def, get_subscription_multiplier,
-    SHOP_ITEMS,
+    MAX_LEVEL, MAX_GRID_SIZE, DEFAULT_UNLOCKED_SLOTS, MAX_OFFLINE_HOURS,
+    QUEST_TEMPLATES, QUEST_TEMPLATE_VERSION, get_subscription_multiplier, get_building_effect, SHOP_ITEMS, SHOP_COSTS,
+    RESOURCES, CREATURE_INDEX, PRODUCTION, INTERVAL_SEC, INTERVAL_CLASSES,
+    SUBSCRIPTION_DURATION_MS, GLOBAL_EVENTS,
 )
+from .game_state import GameState, CreatureId
+from .multiplier_timeline import MultiplierTimeline
+from .xp_table import resolve_level
 
-
-# ─── IDs ──────────────────────────────────────────────────────────────────────
-def make_creature_id() -> str:
-    chars = string.ascii_lowercase + string.digits
-    return "c_" + "".join(random.choices(chars, k=10)) + f"_{int(time.time()*1000)%100000}"
+StateLike = Union[GameState, dict]
 
 
+# ─── IDs ──────────────────────────────────────────────────────────────────────
 def make_referral_code() -> str:
     return "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
 
@@ -26,9 +30,9 @@ def make_referral_code() -> str:
 # ─── Default state ─────────────────────────────────────────────────────────────
 def default_game_state(lang: str = "en") -> dict:
     grid = [None] * MAX_GRID_SIZE
-    grid[0] = _new_creature("fairy_cat", 1)
-    grid[1] = _new_creature("fairy_cat", 1)
-    grid[2] = _new_creature("mushroom_sprite", 1)
+    grid[0] = _new_creature(1, "fairy_cat", 1)
+    grid[1] = _new_creature(2, "fairy_cat", 1)
+    grid[2] = _new_creature(3, "mushroom_sprite", 1)
 
     return {
         "grid": grid,
@@ -43,19 +47,20 @@ def default_game_state(lang: str = "en") -> dict:
             {"family": "mushroom_sprite", "level": 1, "discoveredAt": int(time.time() * 1000), "totalMerged": 0},
         ],
         "buildings": [],
-        "dailyQuests": generate_daily_quests(),
-        "questLastReset": int(time.time() * 1000),
+        "dailyQuests": [],      # materialized by roll_daily_quests() on load
+        "questLastReset": 0,
         "totalMerges": 0,
         "referralCode": "",  # set externally
         "referralCount": 0,
         "subscription": "none",
         "noAds": False,
+        "nextCreatureId": 4,
     }
 
 
-def _new_creature(family: str, level: int) -> dict:
+def _new_creature(creature_id: int, family: str, level: int) -> dict:
     return {
-        "id": make_creature_id(),
+        "id": creature_id,
         "family": family,
         "level": level,
         "lastCollected": int(time.time() * 1000),
@@ -64,55 +69,84 @@ def _new_creature(family: str, level: int) -> dict:
     }
 
 
+# ─── Multipliers ──────────────────────────────────────────────────────────────
+def multiplier_timeline(subscription: str, subscription_expires: Optional[int], boosters: list) -> MultiplierTimeline:
+    """Production multiplier over time from the subscription, boosters and GLOBAL_EVENTS."""
+    sub_mult = get_subscription_multiplier(subscription)
+    if not boosters and not GLOBAL_EVENTS and not subscription_expires:
+        return MultiplierTimeline.constant(sub_mult)
+
+    base, sources = 1.0, []
+    if subscription_expires:
+        sources.append((subscription_expires - SUBSCRIPTION_DURATION_MS, subscription_expires, sub_mult))
+    else:
+        base = sub_mult     # no recorded expiry: always on
+    sources += [(b["start"], b["end"], b["multiplier"]) for b in boosters]
+    sources += [(e["start_ms"], e["end_ms"], e["multiplier"]) for e in GLOBAL_EVENTS]
+    return MultiplierTimeline.build(sources, base)
+
+
+def production_timeline(state: GameState) -> MultiplierTimeline:
+    return multiplier_timeline(state.subscription, state.subscription_expires, state.boosters)
+
+
 # ─── Offline bonus calculation ────────────────────────────────────────────────
-def calculate_offline_bonus(state: dict, current_time_ms: int) -> dict:
-    last_online = state.get("lastOnline", current_time_ms)
+def calculate_offline_bonus(state: StateLike, current_time_ms: int) -> dict:
+    state = GameState.of(state)
+    last_online = state.last_online or current_time_ms
     offline_ms = min(current_time_ms - last_online, MAX_OFFLINE_HOURS * 3600 * 1000)
     if offline_ms < 30_000:
         return {"leaves": 0, "dew": 0, "berries": 0}
 
     offline_sec = offline_ms / 1000
-    sub = state.get("subscription", "none")
-    mult = get_subscription_multiplier(sub)
-
-    leaves = dew = berries = 0
-    for creature in state.get("grid", []):
-        if not creature:
-            continue
-        try:
-            cdef = get_creature_def(creature["family"], creature["level"])
-        except ValueError:
-            continue
-        prod = cdef["production"]
-        interval = cdef["interval_sec"]
+    timeline = production_timeline(state)
+
+    # Every creature in an interval class gets the same ticks, so the grid's
+    # aggregate rate per class is enough
+    mult = timeline.constant_over(last_online, last_online + offline_ms)
+    if mult is not None:
+        leaves = dew = berries = 0
+        for interval, (r_leaves, r_dew, r_berries) in zip(INTERVAL_CLASSES, state.production_rates()):
+            ticks = int(offline_sec / interval)
+            leaves  += r_leaves  * ticks
+            dew     += r_dew     * ticks
+            berries += r_berries * ticks
+        return {"leaves": int(leaves * mult), "dew": int(dew * mult), "berries": int(berries * mult)}
+
+    # Otherwise split each class's ticks by the multiplier they land in
+    by_mult: dict[float, list] = {}
+    for interval, rate in zip(INTERVAL_CLASSES, state.production_rates()):
         ticks = int(offline_sec / interval)
-        leaves  += prod["leaves"]  * ticks
-        dew     += prod["dew"]     * ticks
-        berries += prod["berries"] * ticks
+        for count, mult in timeline.tick_weights(last_online, interval * 1000, ticks):
+            acc = by_mult.setdefault(mult, [0, 0, 0])
+            for i, r in enumerate(rate):
+                acc[i] += r * count
 
-    return {
-        "leaves":  int(leaves  * mult),
-        "dew":     int(dew     * mult),
-        "berries": int(berries * mult),
-    }
+    totals = [0, 0, 0]
+    for mult, acc in by_mult.items():
+        for i, amount in enumerate(acc):
+            totals[i] += amount * mult
+    return dict(zip(RESOURCES, map(int, totals)))
 
 
 # ─── Merge ─────────────────────────────────────────────────────────────────────
-def perform_merge(state: dict, from_id: str, to_id: str) -> tuple[dict, dict]:
+def perform_merge(state: StateLike, from_id: CreatureId, to_id: CreatureId) -> tuple[GameState, dict]:
     """
-    Returns (updated_state, merge_result).
+    Returns (state, merge_result); the state is updated in place.
     Raises ValueError with user-friendly message on failure.
     """
-    grid = state["grid"]
+    state = GameState.of(state)
 
-    from_idx = next((i for i, c in enumerate(grid) if c and c["id"] == from_id), None)
-    to_idx   = next((i for i, c in enumerate(grid) if c and c["id"] == to_id), None)
+    from_idx = state.slot_of(from_id)
+    to_idx   = state.slot_of(to_id)
 
     if from_idx is None or to_idx is None:
         raise ValueError("Creature not found")
+    if from_idx == to_idx:
+        raise ValueError("Cannot merge a creature with itself")
 
-    from_c = grid[from_idx]
-    to_c   = grid[to_idx]
+    from_c = state.grid[from_idx]
+    to_c   = state.grid[to_idx]
 
     if from_c["family"] != to_c["family"] or from_c["level"] != to_c["level"]:
         raise ValueError("Creatures must be the same type and level to merge")
@@ -121,46 +155,22 @@ def perform_merge(state: dict, from_id: str, to_id: str) -> tuple[dict, dict]:
         raise ValueError("Already at max level")
 
     new_level = from_c["level"] + 1
-    new_creature = _new_creature(from_c["family"], new_level)
+    new_creature = _new_creature(state.new_creature_id(), from_c["family"], new_level)
 
     # Replace to_idx, clear from_idx
-    new_grid = list(grid)
-    new_grid[to_idx] = new_creature
-    new_grid[from_idx] = None
+    state.remove(from_idx)
+    state.place(to_idx, new_creature)
 
     # XP
     xp_gained = new_level * 10
-    exp = state.get("experience", 0) + xp_gained
-    lvl = state.get("level", 1)
-    while exp >= _xp_for_level(lvl + 1):
-        exp -= _xp_for_level(lvl + 1)
-        lvl += 1
+    state.level, state.experience = resolve_level(state.level, state.experience + xp_gained)
 
     # Update collection
-    disc = list(state.get("discoveredCreatures", []))
-    existing = next((d for d in disc if d["family"] == from_c["family"] and d["level"] == new_level), None)
-    if existing:
-        existing["totalMerged"] += 1
-    else:
-        disc.append({
-            "family": from_c["family"],
-            "level": new_level,
-            "discoveredAt": int(time.time() * 1000),
-            "totalMerged": 1,
-        })
+    state.discover(from_c["family"], new_level, int(time.time() * 1000), merged=1)
 
     # Update quests
-    quests = _update_quest_progress(state.get("dailyQuests", []), "merge", 1)
-
-    new_state = {
-        **state,
-        "grid": new_grid,
-        "experience": exp,
-        "level": lvl,
-        "totalMerges": state.get("totalMerges", 0) + 1,
-        "discoveredCreatures": disc,
-        "dailyQuests": quests,
-    }
+    state.quest_event("merge", 1, from_c["family"])
+    state.total_merges += 1
 
     result = {
         "newCreatureId": new_creature["id"],
@@ -168,72 +178,132 @@ def perform_merge(state: dict, from_id: str, to_id: str) -> tuple[dict, dict]:
         "xpGained": xp_gained,
     }
 
-    return new_state, result
+    return state, result
+
+
+def merge_all(state: StateLike) -> tuple[GameState, dict]:
+    """
+    Merge every matching pair on the grid, lowest level first, so new
+    creatures chain upward until no (family, level) has two left. Pairs
+    are taken in slot order and merge into the lower slot.
+    """
+    state = GameState.of(state)
+    buckets: dict[tuple[str, int], list[int]] = {}
+    for idx, creature in enumerate(state.grid):
+        if creature and creature["level"] < MAX_LEVEL:
+            buckets.setdefault((creature["family"], creature["level"]), []).append(idx)
+
+    merges = xp_gained = 0
+    for level in range(1, MAX_LEVEL):
+        for (family, lvl), slots in list(buckets.items()):
+            if lvl != level or len(slots) < 2:
+                continue
+            slots.sort()
+            for to_idx, from_idx in zip(slots[0::2], slots[1::2]):
+                state, result = perform_merge(state, state.grid[from_idx]["id"], state.grid[to_idx]["id"])
+                merges += 1
+                xp_gained += result["xpGained"]
+                if level + 1 < MAX_LEVEL:
+                    buckets.setdefault((family, level + 1), []).append(to_idx)
+
+    return state, {"merges": merges, "xpGained": xp_gained}
 
 
 # ─── Collect ───────────────────────────────────────────────────────────────────
-def perform_collect(state: dict, creature_id: str) -> tuple[dict, dict]:
-    grid = state["grid"]
-    idx = next((i for i, c in enumerate(grid) if c and c["id"] == creature_id), None)
+def perform_collect(state: StateLike, creature_id: CreatureId) -> tuple[GameState, dict]:
+    state = GameState.of(state)
+    idx = state.slot_of(creature_id)
     if idx is None:
         raise ValueError("Creature not found")
 
-    creature = grid[idx]
-    try:
-        cdef = get_creature_def(creature["family"], creature["level"])
-    except ValueError:
+    creature = state.grid[idx]
+    k = CREATURE_INDEX.get((creature["family"], creature["level"]))
+    if k is None:
         raise ValueError("Invalid creature type")
 
     now_ms = int(time.time() * 1000)
-    elapsed_sec = (now_ms - creature["lastCollected"]) / 1000
-    ticks = int(elapsed_sec / cdef["interval_sec"])
-
-    if ticks == 0:
+    amounts = _collect_amounts(k, creature, now_ms, production_timeline(state), _building_effects(state))
+    if amounts is None:
         return state, {"leaves": 0, "dew": 0, "berries": 0}
 
-    prod = cdef["production"]
-    sub = state.get("subscription", "none")
-    mult = get_subscription_multiplier(sub)
+    earned = dict(zip(RESOURCES, amounts))
+    _credit(state.resources, earned)
 
-    earned = {
-        "leaves":  int(prod["leaves"]  * ticks * mult),
-        "dew":     int(prod["dew"]     * ticks * mult),
-        "berries": int(prod["berries"] * ticks * mult),
-    }
+    state.place(idx, {**creature, "lastCollected": now_ms, "isCollecting": False})
+
+    state.quest_event("collect", earned["leaves"] + earned["dew"], creature["family"], earned)
+
+    return state, earned
+
+
+def collect_all(state: StateLike) -> tuple[GameState, dict]:
+    """
+    Collect from every creature on the grid in one pass. Same per-creature
+    rounding and building bonuses as perform_collect; quest progress is fed
+    once per family with that family's totals. Unknown creatures are skipped.
+    """
+    state = GameState.of(state)
+    now_ms = int(time.time() * 1000)
+    effects = _building_effects(state)
+    timeline = production_timeline(state)
+
+    by_family: dict[str, list] = {}
+    collected = 0
+    for idx, creature in enumerate(state.grid):
+        if not creature:
+            continue
+        k = CREATURE_INDEX.get((creature["family"], creature["level"]))
+        if k is None:
+            continue
+        amounts = _collect_amounts(k, creature, now_ms, timeline, effects)
+        if amounts is None:
+            continue
+        totals = by_family.setdefault(creature["family"], [0] * len(RESOURCES))
+        for i, amt in enumerate(amounts):
+            totals[i] += amt
+        state.place(idx, {**creature, "lastCollected": now_ms, "isCollecting": False})
+        collected += 1
+
+    earned = dict.fromkeys(RESOURCES, 0)
+    for family, totals in by_family.items():
+        family_earned = dict(zip(RESOURCES, totals))
+        state.quest_event("collect", family_earned["leaves"] + family_earned["dew"], family, family_earned)
+        for res, amt in family_earned.items():
+            earned[res] += amt
+    _credit(state.resources, earned)
+
+    return state, {"resources": earned, "collected": collected}
+
+
+def _building_effects(state: GameState) -> list[tuple[tuple, tuple]]:
+    return [e for e in (get_building_effect(b.get("defId")) for b in state.buildings) if e is not None]
+
+
+def _collect_amounts(k: int, creature: dict, now_ms: int, timeline: MultiplierTimeline, effects: list) -> Optional[list]:
+    """Resources one creature yields now, or None if no tick has elapsed."""
+    last = creature["lastCollected"]
+    ticks = int((now_ms - last) / 1000 / INTERVAL_SEC[k])
+    if ticks == 0:
+        return None
+
+    # Each tick at the multiplier in force when it lands
+    weights = timeline.tick_weights(last, INTERVAL_SEC[k] * 1000, ticks)
+    amounts = [int(sum(p * count * mult for count, mult in weights)) for p in PRODUCTION[k]]
 
     # Building bonuses
-    buildings = state.get("buildings", [])
-    for b in buildings:
-        if b.get("defId") == "cozy_cottage":
-            earned["leaves"] = int(earned["leaves"] * 1.10)
-        if b.get("defId") == "crystal_tower":
-            earned["dew"] = int(earned["dew"] * 1.15)
-        if b.get("defId") == "mushroom_hut":
-            earned["leaves"] += 1
-            earned["dew"] += 1
-
-    resources = dict(state.get("resources", {}))
-    resources["leaves"]  = resources.get("leaves",  0) + earned["leaves"]
-    resources["dew"]     = resources.get("dew",     0) + earned["dew"]
-    resources["berries"] = resources.get("berries", 0) + earned["berries"]
-
-    new_grid = list(grid)
-    new_grid[idx] = {**creature, "lastCollected": now_ms, "isCollecting": False}
-
-    quests = _update_quest_progress(
-        state.get("dailyQuests", []),
-        "collect",
-        earned["leaves"] + earned["dew"],
-        creature["family"],
-        earned,
-    )
-
-    new_state = {**state, "grid": new_grid, "resources": resources, "dailyQuests": quests}
-    return new_state, earned
+    for b_mult, b_add in effects:
+        amounts = [int(v * m) + a for v, m, a in zip(amounts, b_mult, b_add)]
+    return amounts
+
+
+def _credit(resources: dict, earned: dict) -> None:
+    for res, amt in earned.items():
+        resources[res] = resources.get(res, 0) + amt
 
 
 # ─── Shop ──────────────────────────────────────────────────────────────────────
-def perform_buy(state: dict, item_id: str) -> tuple[dict, dict]:
+def perform_buy(state: StateLike, item_id: str) -> tuple[GameState, dict]:
+    state = GameState.of(state)
     item = SHOP_ITEMS.get(item_id)
     if not item:
         raise ValueError("Unknown item")
@@ -242,78 +312,127 @@ def perform_buy(state: dict, item_id: str) -> tuple[dict, dict]:
         # Stars items are handled by payment flow, not here
         raise ValueError("Use payment flow for Stars items")
 
-    cost = item.get("cost", {})
-    resources = dict(state.get("resources", {}))
+    cost = SHOP_COSTS[item_id]
+    resources = state.resources
 
     # Check afford
-    for res, amt in cost.items():
+    for res, amt in zip(RESOURCES, cost):
         if resources.get(res, 0) < amt:
             raise ValueError(f"Not enough {res}")
 
-    # Deduct
-    for res, amt in cost.items():
-        resources[res] = resources.get(res, 0) - amt
-
-    result = {}
-
     if item["category"] == "creature":
         # Find empty slot
-        grid = list(state.get("grid", [None] * MAX_GRID_SIZE))
-        unlocked = state.get("unlockedSlots", DEFAULT_UNLOCKED_SLOTS)
-        empty_idx = next((i for i, c in enumerate(grid) if c is None and i < unlocked), None)
+        empty_idx = state.first_free_slot()
         if empty_idx is None:
             raise ValueError("No free slot")
 
-        creature = _new_creature(item["creature_family"], item["creature_level"])
-        grid[empty_idx] = creature
-
-        disc = list(state.get("discoveredCreatures", []))
-        if not any(d["family"] == item["creature_family"] and d["level"] == item["creature_level"] for d in disc):
-            disc.append({
-                "family": item["creature_family"],
-                "level": item["creature_level"],
-                "discoveredAt": int(time.time() * 1000),
-                "totalMerged": 0,
-            })
+        _deduct(resources, cost)
+        creature = _new_creature(state.new_creature_id(), item["creature_family"], item["creature_level"])
+        state.place(empty_idx, creature)
+        state.discover(item["creature_family"], item["creature_level"], int(time.time() * 1000))
 
-        new_state = {**state, "grid": grid, "resources": resources, "discoveredCreatures": disc}
         result = {"success": True, "newCreatureId": creature["id"], "message": "Creature added!"}
-        return new_state, result
+        return state, result
 
     elif item["category"] == "booster":
-        new_state = {**state, "resources": resources}
-        result = {"success": True, "message": "Booster applied!"}
-        return new_state, result
+        _deduct(resources, cost)
+        end = _add_booster(state, item_id, item, int(time.time() * 1000))
+        result = {"success": True, "boostUntil": end, "message": "Booster applied!"}
+        return state, result
 
     return state, {"success": False, "message": "Unknown category"}
 
 
-def apply_stars_purchase(state: dict, item_id: str) -> dict:
+def _add_booster(state: GameState, item_id: str, item: dict, now_ms: int) -> int:
+    """
+    Queue a booster after any running one of the same item (they extend
+    rather than stack) and drop boosters no pending production can reach.
+    Returns when the new one ends.
+    """
+    oldest = min((c["lastCollected"] for c in state.grid if c), default=now_ms)
+    horizon = min(oldest, state.last_online or now_ms)
+    state.boosters = [b for b in state.boosters if b["end"] > horizon]
+
+    start = max([now_ms] + [b["end"] for b in state.boosters if b["itemId"] == item_id])
+    end = start + item["duration_min"] * 60 * 1000
+    state.boosters.append({"itemId": item_id, "start": start, "end": end, "multiplier": item["multiplier"]})
+    return end
+
+
+def _deduct(resources: dict, cost: tuple) -> None:
+    for res, amt in zip(RESOURCES, cost):
+        if amt:
+            resources[res] = resources.get(res, 0) - amt
+
+
+def apply_stars_purchase(state: StateLike, item_id: str) -> GameState:
     """Apply effects of a Stars-paid item to state."""
+    state = GameState.of(state)
     item = SHOP_ITEMS.get(item_id)
     if not item:
         return state
 
-    new_state = dict(state)
-
     if item["category"] == "slot":
-        new_state["unlockedSlots"] = min(
-            MAX_GRID_SIZE,
-            new_state.get("unlockedSlots", DEFAULT_UNLOCKED_SLOTS) + item.get("slots", 5)
+        state.unlocked_slots = min(
+            max(MAX_GRID_SIZE, len(state.grid)),
+            state.unlocked_slots + item.get("slots", 5),
         )
     elif item["category"] == "cosmetic" and item_id == "no_ads":
-        new_state["noAds"] = True
+        state.no_ads = True
+
+    return state
+
+
+# ─── Batched actions ───────────────────────────────────────────────────────────
+def _collect_action(state: GameState, action: dict) -> tuple[GameState, dict]:
+    state, earned = perform_collect(state, action.get("creature_id"))
+    return state, {"resources": earned}
 
-    return new_state
+
+_ACTIONS = {
+    "merge":       lambda state, a: perform_merge(state, a.get("from_id"), a.get("to_id")),
+    "collect":     _collect_action,
+    "buy":         lambda state, a: perform_buy(state, a.get("item_id")),
+    "collect_all": lambda state, a: collect_all(state),
+    "merge_all":   lambda state, a: merge_all(state),
+}
+
+
+def apply_actions(state: StateLike, actions: list[dict]) -> tuple[GameState, list[dict], Optional[dict]]:
+    """
+    Apply merge / collect / buy (and collect_all / merge_all) actions in
+    order on one state.
+
+    Stops at the first action that fails; the ones before it stay applied
+    (actions validate before mutating, so the failed one leaves no trace).
+    Returns (state, per-action results, error) where error is None or
+    {"index", "detail"}.
+    """
+    state = GameState.of(state)
+    results = []
+    for i, action in enumerate(actions):
+        handler = _ACTIONS.get(action.get("type"))
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown action: {action.get('type')}")
+            state, result = handler(state, action)
+        except ValueError as e:
+            return state, results, {"index": i, "detail": str(e)}
+        results.append(result)
+    return state, results, None
 
 
 # ─── Daily Quests ──────────────────────────────────────────────────────────────
-def generate_daily_quests(count: int = 4) -> list[dict]:
+QUEST_DAY_MS = 24 * 3600 * 1000
+
+
+def generate_daily_quests(count: int = 4, rng: random.Random = None) -> list[dict]:
     """Pick random quests from templates."""
-    templates = random.sample(QUEST_TEMPLATES, min(count, len(QUEST_TEMPLATES)))
+    rng = rng or random
+    templates = rng.sample(QUEST_TEMPLATES, min(count, len(QUEST_TEMPLATES)))
     quests = []
     for tmpl in templates:
-        q_id = "q_" + "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
+        q_id = "q_" + "".join(rng.choices(string.ascii_lowercase + string.digits, k=8))
         quest = {
             "id": q_id,
             "type": tmpl["type"],
@@ -333,52 +452,37 @@ def generate_daily_quests(count: int = 4) -> list[dict]:
     return quests
 
 
-def refresh_quests_if_needed(state: dict) -> dict:
-    now_ms = int(time.time() * 1000)
-    last_reset = state.get("questLastReset", 0)
-    if now_ms - last_reset > 24 * 3600 * 1000:
-        return {
-            **state,
-            "dailyQuests": generate_daily_quests(),
-            "questLastReset": now_ms,
-        }
-    return state
+def quest_day(now_ms: int = None) -> int:
+    """UTC day number quests are rolled by."""
+    return (now_ms if now_ms is not None else int(time.time() * 1000)) // QUEST_DAY_MS
 
 
-def _update_quest_progress(
-    quests: list, event_type: str, amount: int,
-    family: str = "", resources: dict = None
-) -> list:
-    resources = resources or {}
-    updated = []
-    for q in quests:
-        if q.get("completed") or q.get("claimedAt"):
-            updated.append(q)
-            continue
+def daily_quests_for(telegram_id: int, day: int) -> list[dict]:
+    """A user's quests for a UTC day — always the same for the same inputs."""
+    seed = hashlib.blake2b(f"{telegram_id}:{day}:{QUEST_TEMPLATE_VERSION}".encode(), digest_size=8).digest()
+    return generate_daily_quests(rng=random.Random(int.from_bytes(seed, "big")))
 
-        q = dict(q)
-        if q["type"] == "merge" and event_type == "merge":
-            q["currentAmount"] = min(q["currentAmount"] + amount, q["targetAmount"])
-        elif q["type"] == "collect" and event_type == "collect":
-            res_key = q.get("targetResource", "leaves")
-            earned = resources.get(res_key, 0)
-            q["currentAmount"] = min(q["currentAmount"] + earned, q["targetAmount"])
-        elif q["type"] == "collect_type" and event_type == "collect" and q.get("targetFamily") == family:
-            res_key = q.get("targetResource", "leaves")
-            earned = resources.get(res_key, 0)
-            q["currentAmount"] = min(q["currentAmount"] + earned, q["targetAmount"])
 
-        q["completed"] = q["currentAmount"] >= q["targetAmount"]
-        updated.append(q)
-    return updated
+def roll_daily_quests(state: dict, telegram_id: int, now_ms: int = None) -> dict:
+    """
+    Swap in today's quests if the stored ones are from an earlier UTC day.
+    Applied on load, so the new day's quests cost no write: they are stored
+    (with their progress) by the next write that happens anyway.
+    """
+    today = quest_day(now_ms)
+    if state.get("questLastReset", 0) // QUEST_DAY_MS != today:
+        state["dailyQuests"] = daily_quests_for(telegram_id, today)
+        state["questLastReset"] = today * QUEST_DAY_MS
+    return state
 
 
-def claim_quest(state: dict, quest_id: str) -> tuple[dict, dict]:
-    quests = list(state.get("dailyQuests", []))
-    quest = next((q for q in quests if q["id"] == quest_id), None)
+def claim_quest(state: StateLike, quest_id: str) -> tuple[GameState, dict]:
+    state = GameState.of(state)
+    idx = state.quest_position(quest_id)
 
-    if not quest:
+    if idx is None:
         raise ValueError("Quest not found")
+    quest = state.daily_quests[idx]
     if not quest.get("completed"):
         raise ValueError("Quest not yet completed")
     if quest.get("claimedAt"):
@@ -390,54 +494,34 @@ def claim_quest(state: dict, quest_id: str) -> tuple[dict, dict]:
         "berries": quest.get("rewardBerries", 0),
     }
 
-    resources = dict(state.get("resources", {}))
-    resources["leaves"]  = resources.get("leaves",  0) + reward["leaves"]
-    resources["dew"]     = resources.get("dew",     0) + reward["dew"]
-    resources["berries"] = resources.get("berries", 0) + reward["berries"]
-
-    updated_quests = [
-        {**q, "claimedAt": int(time.time() * 1000)} if q["id"] == quest_id else q
-        for q in quests
-    ]
+    _credit(state.resources, reward)
 
-    new_state = {**state, "resources": resources, "dailyQuests": updated_quests}
-    return new_state, reward
+    state.daily_quests[idx] = {**quest, "claimedAt": int(time.time() * 1000)}
+    return state, reward
 
 
 # ─── Referral reward ───────────────────────────────────────────────────────────
-def apply_referral_reward(state: dict) -> dict:
+def apply_referral_reward(state: StateLike) -> GameState:
     """Give the referred user a free Fluffy Kit."""
-    grid = list(state.get("grid", [None] * MAX_GRID_SIZE))
-    unlocked = state.get("unlockedSlots", DEFAULT_UNLOCKED_SLOTS)
-    empty_idx = next((i for i, c in enumerate(grid) if c is None and i < unlocked), None)
-
-    if empty_idx is not None:
-        creature = _new_creature("fairy_cat", 1)
-        grid[empty_idx] = creature
-        return {**state, "grid": grid}
-
-    # No slot — give leaves instead
-    resources = dict(state.get("resources", {}))
-    resources["leaves"] = resources.get("leaves", 0) + 50
-    return {**state, "resources": resources}
+    state = GameState.of(state)
+    _grant_fairy_cat_or_leaves(state)
+    return state
 
 
-def apply_referrer_reward(state: dict) -> dict:
+def apply_referrer_reward(state: StateLike) -> GameState:
     """Give the referrer a bonus too."""
-    grid = list(state.get("grid", [None] * MAX_GRID_SIZE))
-    unlocked = state.get("unlockedSlots", DEFAULT_UNLOCKED_SLOTS)
-    empty_idx = next((i for i, c in enumerate(grid) if c is None and i < unlocked), None)
+    state = GameState.of(state)
+    _grant_fairy_cat_or_leaves(state)
+    state.referral_count += 1
+    return state
 
-    if empty_idx is not None:
-        creature = _new_creature("fairy_cat", 1)
-        grid[empty_idx] = creature
-        return {**state, "grid": grid, "referralCount": state.get("referralCount", 0) + 1}
 
-    resources = dict(state.get("resources", {}))
-    resources["leaves"] = resources.get("leaves", 0) + 50
-    return {**state, "resources": resources, "referralCount": state.get("referralCount", 0) + 1}
+def _grant_fairy_cat_or_leaves(state: GameState) -> None:
+    empty_idx = state.first_free_slot()
+    if empty_idx is not None:
+        state.place(empty_idx, _new_creature(state.new_creature_id(), "fairy_cat", 1))
+        return
 
+    # No slot — give leaves instead
+    state.resources["leaves"] = state.resources.get("leaves", 0) + 50
 
-# ─── Helpers ───────────────────────────────────────────────────────────────────
-def _xp_for_level(level: int) -> int:
-    return int(100 * (1.4 ** (level - 1)))
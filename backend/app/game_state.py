@@ -0,0 +1,197 @@
+"""
+In-memory game state used by game_service.
+
+Loads from the JSON shape stored in User.game_state or sent by the frontend
+and dumps to the stored one, but keeps indexes so actions don't scan or copy:
+  • creature id → grid slot (ids are per-user ints from nextCreatureId;
+    legacy "c_…" string ids from older saves still resolve)
+  • free-slot bitmap (bit i set ⇔ slot i empty)
+  • production per tick summed over the grid, per interval class
+  • discoveredCreatures as a bitmask + arrays by creature index (see collection)
+  • open daily quests by the events they listen to (see quest_engine)
+Actions mutate the object in place; validate before touching anything.
+"""
+from typing import Optional, Union
+
+from .game_data import MAX_GRID_SIZE, DEFAULT_UNLOCKED_SLOTS, CREATURE_INDEX, PRODUCTION, INTERVAL_CLASS, INTERVAL_CLASSES
+from .quest_engine import INDEX_MIN_QUESTS, QuestEvent, QuestIndex, apply_event, scan_event
+from .collection import Collection
+
+# Per-user int; str for creatures created before int ids
+CreatureId = Union[int, str]
+
+
+class GameState:
+    __slots__ = (
+        "grid", "unlocked_slots", "resources", "level", "experience",
+        "last_online", "catchup_bonus", "collection", "buildings",
+        "_daily_quests", "quest_last_reset", "total_merges", "referral_code",
+        "referral_count", "subscription", "subscription_expires", "no_ads", "next_creature_id",
+        "boosters", "extra",
+        "_slot_of", "_free", "_rates", "_quest_index",
+    )
+
+    # JSON key → attribute, for the fields that are plain values
+    _SCALARS = (
+        ("unlockedSlots", "unlocked_slots", DEFAULT_UNLOCKED_SLOTS),
+        ("level", "level", 1),
+        ("experience", "experience", 0),
+        ("lastOnline", "last_online", 0),
+        ("questLastReset", "quest_last_reset", 0),
+        ("totalMerges", "total_merges", 0),
+        ("referralCode", "referral_code", ""),
+        ("referralCount", "referral_count", 0),
+        ("subscription", "subscription", "none"),
+        ("subscriptionExpires", "subscription_expires", None),
+        ("noAds", "no_ads", False),
+        ("nextCreatureId", "next_creature_id", 1),
+    )
+    _KNOWN_KEYS = frozenset(
+        [k for k, _, _ in _SCALARS]
+        + ["grid", "resources", "catchupBonus", "collection", "discoveredCreatures", "buildings", "dailyQuests", "boosters"]
+    )
+
+    # ─── Load / dump ──────────────────────────────────────────────────────────
+    @classmethod
+    def from_dict(cls, data: dict) -> "GameState":
+        gs = cls.__new__(cls)
+        for key, attr, default in cls._SCALARS:
+            setattr(gs, attr, data.get(key, default))
+        gs.grid = list(data.get("grid") or [None] * MAX_GRID_SIZE)
+        gs.resources = dict(data.get("resources") or {"leaves": 0, "dew": 0, "berries": 0})
+        gs.catchup_bonus = dict(data.get("catchupBonus") or {"leaves": 0, "dew": 0, "berries": 0})
+        if "discoveredCreatures" in data:   # API shape, e.g. a client save
+            gs.collection = Collection.from_list(data["discoveredCreatures"])
+        else:
+            gs.collection = Collection.from_compact(data.get("collection") or {})
+        gs.buildings = list(data.get("buildings", []))
+        gs.boosters = list(data.get("boosters", []))
+        gs.daily_quests = list(data.get("dailyQuests", []))
+        gs.extra = {k: v for k, v in data.items() if k not in cls._KNOWN_KEYS}
+        gs._reindex()
+        return gs
+
+    @classmethod
+    def of(cls, state: Union["GameState", dict]) -> "GameState":
+        return state if isinstance(state, GameState) else cls.from_dict(state)
+
+    def to_dict(self) -> dict:
+        """Stored shape; collection.expand_state() turns it into the API shape."""
+        data = {key: getattr(self, attr) for key, attr, _ in self._SCALARS}
+        data.update(
+            grid=self.grid,
+            resources=self.resources,
+            catchupBonus=self.catchup_bonus,
+            collection=self.collection.to_compact(),
+            buildings=self.buildings,
+            boosters=self.boosters,
+            dailyQuests=self.daily_quests,
+        )
+        data.update(self.extra)
+        return data
+
+    def _reindex(self) -> None:
+        self._slot_of = {}
+        self._free = 0
+        self._rates = [[0, 0, 0] for _ in INTERVAL_CLASSES]
+        top_id = 0
+        for i, c in enumerate(self.grid):
+            if c is None:
+                self._free |= 1 << i
+            else:
+                cid = c["id"]
+                self._slot_of[cid] = i
+                self._add_rate(c, 1)
+                if type(cid) is int and cid > top_id:
+                    top_id = cid
+        # A client save may have dropped or rewound the counter
+        if self.next_creature_id <= top_id:
+            self.next_creature_id = top_id + 1
+
+    # ─── Grid ─────────────────────────────────────────────────────────────────
+    def new_creature_id(self) -> int:
+        cid = self.next_creature_id
+        self.next_creature_id = cid + 1
+        return cid
+
+    def slot_of(self, creature_id: CreatureId) -> Optional[int]:
+        if type(creature_id) is str and creature_id.isdigit():
+            creature_id = int(creature_id)   # int id that went through a string somewhere
+        return self._slot_of.get(creature_id)
+
+    def creature(self, creature_id: CreatureId) -> Optional[dict]:
+        slot = self.slot_of(creature_id)
+        return None if slot is None else self.grid[slot]
+
+    def first_free_slot(self) -> Optional[int]:
+        """Lowest empty slot among the unlocked ones."""
+        mask = self._free & ((1 << self.unlocked_slots) - 1)
+        if not mask:
+            return None
+        return (mask & -mask).bit_length() - 1
+
+    def place(self, slot: int, creature: dict) -> None:
+        old = self.grid[slot]
+        if old is not None:
+            self._slot_of.pop(old["id"], None)
+            self._add_rate(old, -1)
+        self.grid[slot] = creature
+        self._slot_of[creature["id"]] = slot
+        self._add_rate(creature, 1)
+        self._free &= ~(1 << slot)
+
+    def remove(self, slot: int) -> Optional[dict]:
+        old = self.grid[slot]
+        if old is not None:
+            self._slot_of.pop(old["id"], None)
+            self._add_rate(old, -1)
+        self.grid[slot] = None
+        self._free |= 1 << slot
+        return old
+
+    # ─── Production ───────────────────────────────────────────────────────────
+    def _add_rate(self, creature: dict, sign: int) -> None:
+        k = CREATURE_INDEX.get((creature["family"], creature["level"]))
+        if k is None:
+            return
+        rate = self._rates[INTERVAL_CLASS[k]]
+        p_leaves, p_dew, p_berries = PRODUCTION[k]
+        rate[0] += sign * p_leaves
+        rate[1] += sign * p_dew
+        rate[2] += sign * p_berries
+
+    def production_rates(self) -> list[list[int]]:
+        """Per INTERVAL_CLASSES entry: resources the grid yields per tick, in RESOURCES order."""
+        return self._rates
+
+    # ─── Collection ───────────────────────────────────────────────────────────
+    def discover(self, family: str, level: int, now_ms: int, merged: int = 0) -> None:
+        """Record a creature in the bestiary, bumping totalMerged if already known."""
+        self.collection.discover(family, level, now_ms, merged)
+
+    # ─── Quests ───────────────────────────────────────────────────────────────
+    @property
+    def daily_quests(self) -> list:
+        return self._daily_quests
+
+    @daily_quests.setter
+    def daily_quests(self, quests: list) -> None:
+        self._daily_quests = quests
+        self._quest_index = None
+
+    def _quests_indexed(self) -> QuestIndex:
+        if self._quest_index is None:
+            self._quest_index = QuestIndex(self._daily_quests)
+        return self._quest_index
+
+    def quest_event(self, event_type: str, amount: int = 0, family: str = "", resources: dict = None) -> None:
+        """Advance the open quests listening to this event."""
+        if self._quest_index is None and len(self._daily_quests) < INDEX_MIN_QUESTS:
+            scan_event(self._daily_quests, event_type, amount, family, resources)
+        else:
+            apply_event(self._daily_quests, self._quests_indexed(), QuestEvent(event_type, amount, family, resources))
+
+    def quest_position(self, quest_id: str) -> Optional[int]:
+        if self._quest_index is None and len(self._daily_quests) < INDEX_MIN_QUESTS:
+            return next((pos for pos, q in enumerate(self._daily_quests) if q.get("id") == quest_id), None)
+        return self._quests_indexed().by_id.get(quest_id)
@@ -0,0 +1,40 @@
+"""
+ETag helpers for conditional GETs.
+
+Routes compute a strong ETag from something cheaper than the body (the
+user's state_version, a content hash computed once) and answer
+If-None-Match hits with an empty 304 before loading or encoding any JSON.
+"""
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+# Per-user data: the browser may keep it but must revalidate every time
+REVALIDATE = "private, no-cache"
+# Static catalog: identical for everyone until the next deploy
+LONG_LIVED = "public, max-age=86400"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the given parts."""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
+
+
+def cache_headers(etag: str, cache_control: str = REVALIDATE) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
@@ -0,0 +1,148 @@
+"""
+RFC 6902 JSON Patch, used by delta saves (PATCH /game/state).
+
+apply_patch() never mutates its input: containers on the path of each
+operation are copied before they are changed (everything else is shared with
+the original), so a patch that fails halfway leaves the stored state intact.
+"""
+from typing import Any
+
+_MISSING = object()
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+# ─── JSON Pointer (RFC 6901) ──────────────────────────────────────────────────
+def _tokens(pointer: Any) -> list[str]:
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise JsonPatchError(f"Invalid pointer: {pointer!r}")
+    if not pointer:
+        return []
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    idx = int(token)
+    if idx > len(container) or (idx == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {token}")
+    return idx
+
+
+def _get(doc: Any, tokens: list[str]) -> Any:
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, token)]
+        else:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return doc
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _writable_parent(root: Any, tokens: list[str]) -> Any:
+    """Walk to the parent of tokens[-1], copying every container on the way."""
+    node = root
+    for token in tokens[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+            node[token] = _copy(node[token])
+            node = node[token]
+        elif isinstance(node, list):
+            idx = _index(node, token)
+            node[idx] = _copy(node[idx])
+            node = node[idx]
+        else:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    if not isinstance(node, (dict, list)):
+        raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return node
+
+
+# ─── Operations ───────────────────────────────────────────────────────────────
+def _add(root: Any, tokens: list[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _writable_parent(root, tokens)
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    else:
+        parent.insert(_index(parent, tokens[-1], allow_end=True), value)
+    return root
+
+
+def _remove(root: Any, tokens: list[str]) -> tuple[Any, Any]:
+    if not tokens:
+        raise JsonPatchError("Cannot remove the whole document")
+    parent = _writable_parent(root, tokens)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+        return root, parent.pop(tokens[-1])
+    return root, parent.pop(_index(parent, tokens[-1]))
+
+
+def _replace(root: Any, tokens: list[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _writable_parent(root, tokens)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+        parent[tokens[-1]] = value
+    else:
+        parent[_index(parent, tokens[-1])] = value
+    return root
+
+
+def apply_patch(doc: Any, ops: list[dict]) -> Any:
+    """Return a patched copy of doc. Raises JsonPatchError on any bad op."""
+    if not isinstance(ops, list):
+        raise JsonPatchError("Patch must be a list of operations")
+    root = _copy(doc)
+    for op in ops:
+        if not isinstance(op, dict):
+            raise JsonPatchError("Operation must be an object")
+        kind = op.get("op")
+        path = _tokens(op.get("path"))
+        value = op.get("value", _MISSING)
+
+        if kind in ("add", "replace", "test") and value is _MISSING:
+            raise JsonPatchError(f"'{kind}' needs a value")
+
+        if kind == "add":
+            root = _add(root, path, value)
+        elif kind == "remove":
+            root, _ = _remove(root, path)
+        elif kind == "replace":
+            root = _replace(root, path, value)
+        elif kind == "move":
+            source = _tokens(op.get("from"))
+            if path[:len(source)] == source and path != source:
+                raise JsonPatchError("Cannot move a value into one of its children")
+            root, moved = _remove(root, source)
+            root = _add(root, path, moved)
+        elif kind == "copy":
+            root = _add(root, path, _get(root, _tokens(op.get("from"))))
+        elif kind == "test":
+            if _get(root, path) != value:
+                raise JsonPatchError(f"Test failed at {op.get('path')}")
+        else:
+            raise JsonPatchError(f"Unknown op: {kind!r}")
+    return root
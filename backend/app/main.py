@@ -1,10 +1,15 @@
-from fastapi import FastAPI
+import asyncio
+import hmac
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pathlib import Path
-from .config import get_settings
-from .database import init_db
+from .config import get_settings, metrics_on
+from .database import init_db, engine, async_engine
+from .metrics import MetricsMiddleware, instrument_engine, render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .save_buffer import save_buffer
+from .serializer import FastJSONResponse
 from .routes import auth, game, shop, quests, payments, referral
 
 settings = get_settings()
@@ -15,6 +20,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs" if settings.debug else None,
     redoc_url=None,
+    default_response_class=FastJSONResponse,
 )
 
 # CORS — allow Telegram Mini App origin
@@ -35,6 +41,12 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Added last so it is outermost and its latency includes the other middleware
+if metrics_on(settings):
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "async")
+
 # Include routers (all under /api prefix)
 app.include_router(auth.router,     prefix="/api")
 app.include_router(game.router,     prefix="/api")
@@ -45,18 +57,45 @@ app.include_router(referral.router, prefix="/api")
 
 
 @app.on_event("startup")
-def startup():
+async def startup():
     init_db()
+    if settings.save_coalescing:
+        app.state.save_flusher = asyncio.create_task(
+            save_buffer.run(async_engine, settings.save_flush_interval_sec)
+        )
     print("✅ Enchanted Paws Grove backend started!")
     print(f"   Environment: {settings.environment}")
     print(f"   Frontend URL: {settings.frontend_url}")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    flusher = getattr(app.state, "save_flusher", None)
+    if flusher:
+        flusher.cancel()
+        # A flush interrupted by the cancel puts its batch back; wait for that
+        # before the final flush so it gets written
+        await asyncio.gather(flusher, return_exceptions=True)
+    await save_buffer.flush(async_engine)
+    await async_engine.dispose()
+
+
 @app.get("/api/health")
 def health():
     return {"status": "ok", "game": "Enchanted Paws Grove", "version": "1.0.0"}
 
 
+if metrics_on(settings):
+    @app.get("/api/metrics", include_in_schema=False)
+    def metrics(request: Request):
+        """Prometheus text format; per process."""
+        if settings.metrics_token and not hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(), f"Bearer {settings.metrics_token}".encode(),
+        ):
+            raise HTTPException(status_code=401, detail="Metrics token required")
+        return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Serve static files from frontend/dist (production build)
 FRONTEND_DIST = Path(__file__).parent.parent.parent / "frontend" / "dist"
 FRONTEND_INDEX = FRONTEND_DIST / "index.html"
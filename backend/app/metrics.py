@@ -0,0 +1,255 @@
+"""
+In-process request metrics, exported in the Prometheus text format at
+/api/metrics.
+
+MetricsMiddleware records request count, latency and in-flight requests per
+route template and status; instrument_engine() adds SQL time and pool
+checkout wait for a SQLAlchemy engine. The state codec, the auth HMAC checks
+and outbound httpx calls time themselves with timed(). Values are per
+process, so with several workers each one is scraped separately.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Optional
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. Requests and outbound calls span ms to s; the rest are µs to ms.
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+
+
+# ─── Metric types ─────────────────────────────────────────────────────────────
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values: dict = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_num(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """A settable gauge, or one read at scrape time from collect() → {labels: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), collect: Optional[Callable[[], dict]] = None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+        if not labels:
+            self._values[()] = 0
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> list[str]:
+        if self.collect is not None:
+            values = self.collect()
+            with self._lock:
+                self._values.update(values)
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = REQUEST_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels) -> None:
+        # Per label set: [count per bucket..., count above the last bucket, sum]
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[i] += 1
+            row[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(row)) for labels, row in self._values.items())
+        for labels, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_num(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_num(row[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class timed:
+    """
+    ``with timed(histogram, *labels):`` observes the block's wall time.
+    Also usable in ``async with``, e.g. alongside an httpx.AsyncClient.
+    """
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, *labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+HTTP_REQUESTS = Counter("http_requests_total", "Requests handled.", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency, first byte in to last byte out.",
+                                 ("method", "route", "status"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled.")
+
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Time in the DBAPI execute call, by statement type.",
+                             ("engine", "statement"), FAST_BUCKETS)
+DB_CHECKOUT_SECONDS = Histogram("db_pool_checkout_seconds", "Time to get a connection from the pool.",
+                                ("engine",), FAST_BUCKETS)
+DB_CHECKOUT_WAITING = Gauge("db_pool_checkout_waiting", "Callers currently waiting for a pooled connection.", ("engine",))
+
+STATE_CODEC_SECONDS = Histogram("game_state_codec_seconds", "game_state JSON encode/decode, compression included.",
+                                ("op",), FAST_BUCKETS)
+AUTH_HMAC_SECONDS = Histogram("auth_hmac_seconds", "Signature checks: initData (uncached) and session tokens.",
+                              ("kind",), FAST_BUCKETS)
+OUTBOUND_HTTP_SECONDS = Histogram("outbound_http_seconds", "Outbound httpx calls, by service.", ("target",))
+
+_pools: dict = {}   # engine label → pool, read at scrape time
+
+
+def _pool_checked_out() -> dict:
+    return {(label,): pool.checkedout() for label, pool in _pools.items() if hasattr(pool, "checkedout")}
+
+
+DB_CHECKED_OUT = Gauge("db_pool_checked_out", "Pooled connections currently in use.", ("engine",), collect=_pool_checked_out)
+
+
+# ─── Instrumentation ──────────────────────────────────────────────────────────
+class MetricsMiddleware:
+    """Plain ASGI middleware (no BaseHTTPMiddleware task hop) timing every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            # The router leaves the matched route in scope; label by its
+            # template, never the raw path, to keep label values bounded
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"), str(status))
+            HTTP_REQUESTS.inc(*labels)
+            HTTP_REQUEST_SECONDS.observe(elapsed, *labels)
+
+
+def _timed_execute(execute: Callable, label: str) -> Callable:
+    def wrapper(cursor, statement, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return execute(cursor, statement, *args, **kwargs)
+        finally:
+            verb = statement.lstrip().partition(" ")[0].upper()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, label, verb)
+    return wrapper
+
+
+def instrument_engine(engine, label: str) -> None:
+    """
+    Time SQL statements and pool checkouts on a sync Engine (pass
+    async_engine.sync_engine for the async one).
+
+    Both wrap methods on this engine's own dialect and pool instances rather
+    than using events: merely having before/after_cursor_execute listeners
+    costs ~40µs per statement, and the pool has no "before checkout" event.
+    """
+    dialect = engine.dialect
+    for name in ("do_execute", "do_executemany", "do_execute_no_params"):
+        setattr(dialect, name, _timed_execute(getattr(dialect, name), label))
+
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        DB_CHECKOUT_WAITING.inc(label)
+        try:
+            with timed(DB_CHECKOUT_SECONDS, label):
+                return connect()
+        finally:
+            DB_CHECKOUT_WAITING.dec(label)
+
+    pool.connect = timed_connect
+    _pools[label] = pool
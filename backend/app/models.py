@@ -1,8 +1,35 @@
 import time
-from sqlalchemy import Column, Integer, String, Boolean, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, Float, LargeBinary
+from sqlalchemy.types import TypeDecorator
 from .database import Base
 
 
+class StateBlob(TypeDecorator):
+    """
+    Encoded game_state (see state_codec). Legacy rows hold plain JSON text:
+    SQLite keeps them as text in the old column, so str values are passed
+    through untouched there (a compare-and-swap base read from such a row
+    must stay text to match it). Other databases get the column converted
+    to binary by init_db(), and str values are bound as UTF-8 bytes.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        binary = self.impl_instance.bind_processor(dialect)
+        keep_text = dialect.name == "sqlite"
+
+        def process(value):
+            if value is None:
+                return value
+            if isinstance(value, str):
+                if keep_text:
+                    return value
+                value = value.encode()
+            return binary(value) if binary is not None else value
+        return process
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -13,8 +40,9 @@ class User(Base):
     language_code = Column(String(8), default="en")
     photo_url = Column(String(512), nullable=True)
 
-    # Game state stored as JSON blob for flexibility
-    game_state = Column(Text, nullable=False, default="{}")
+    # Game state stored as an encoded JSON blob for flexibility (see state_codec)
+    game_state = Column(StateBlob, nullable=False, default="{}")
+    state_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every game_state write
 
     # Monetisation
     subscription = Column(String(20), default="none")
@@ -0,0 +1,105 @@
+"""
+Piecewise-constant production multiplier over time.
+
+Subscriptions, boosters and server-wide events each contribute a factor over
+a [start, end) window in unix ms. MultiplierTimeline.build() sweeps them
+into sorted, non-overlapping segments whose multiplier is the product of
+the factors active there, so production over any span is summed per segment
+(a bisect plus one step per segment) instead of per tick.
+
+A tick at time t uses the multiplier of the segment containing t; with a
+single segment the arithmetic is exactly p * ticks * mult, as before.
+"""
+import math
+from bisect import bisect_right
+from typing import Iterable, Optional
+
+NEG_INF = float("-inf")
+POS_INF = float("inf")
+
+Source = tuple[float, float, float]     # (start_ms, end_ms, factor)
+
+
+class MultiplierTimeline:
+    """Segment i covers [times[i], times[i + 1]) at mults[i]; times[0] is -inf."""
+    __slots__ = ("times", "mults")
+
+    def __init__(self, times: list, mults: list[float]):
+        self.times = times
+        self.mults = mults
+
+    @classmethod
+    def build(cls, sources: Iterable[Source], base: float = 1.0) -> "MultiplierTimeline":
+        """Timeline of base times every source factor active at each point."""
+        edges: dict[float, list] = {}
+        for start, end, factor in sources:
+            if factor == 1.0 or start >= end:
+                continue
+            edges.setdefault(start, []).append((1, factor))
+            edges.setdefault(end, []).append((-1, factor))
+
+        times, mults = [NEG_INF], [base]
+        active: list[float] = []
+        for t in sorted(edges):
+            if t == POS_INF:
+                break
+            for sign, factor in edges[t]:
+                if sign > 0:
+                    active.append(factor)
+                else:
+                    active.remove(factor)
+            # Product over a sorted list so equal sets give bit-identical results
+            mult = base * math.prod(sorted(active)) if active else base
+            if t == NEG_INF:
+                mults[0] = mult
+            elif mult != mults[-1]:
+                times.append(t)
+                mults.append(mult)
+        return cls(times, mults)
+
+    @classmethod
+    def constant(cls, mult: float = 1.0) -> "MultiplierTimeline":
+        return cls([NEG_INF], [mult])
+
+    def at(self, t: float) -> float:
+        return self.mults[bisect_right(self.times, t) - 1]
+
+    def constant_over(self, start_ms: float, end_ms: float) -> Optional[float]:
+        """The multiplier if it doesn't change within [start_ms, end_ms], else None."""
+        pos = bisect_right(self.times, start_ms) - 1
+        if pos + 1 < len(self.times) and self.times[pos + 1] <= end_ms:
+            return None
+        return self.mults[pos]
+
+    def integrate(self, start_ms: float, end_ms: float) -> float:
+        """∫ multiplier dt over [start_ms, end_ms), in ms."""
+        pos = bisect_right(self.times, start_ms) - 1
+        total, t = 0.0, start_ms
+        while t < end_ms:
+            seg_end = self.times[pos + 1] if pos + 1 < len(self.times) else POS_INF
+            stop = min(seg_end, end_ms)
+            total += (stop - t) * self.mults[pos]
+            t, pos = stop, pos + 1
+        return total
+
+    def tick_weights(self, start_ms: int, interval_ms: int, ticks: int) -> list[tuple[int, float]]:
+        """
+        (count, multiplier) per segment for the ticks at start_ms + i * interval_ms,
+        i = 1..ticks. Counts add up to ticks.
+        """
+        if ticks <= 0:
+            return []
+        pos = bisect_right(self.times, start_ms + interval_ms) - 1
+        weights = []
+        i = 1
+        while i <= ticks:
+            if pos + 1 < len(self.times):
+                # Last tick strictly before the next segment starts
+                last = min(ticks, -(-(self.times[pos + 1] - start_ms) // interval_ms) - 1)
+            else:
+                last = ticks
+            if last >= i:
+                weights.append((last - i + 1, self.mults[pos]))
+                i = last + 1
+            pos += 1
+        return weights
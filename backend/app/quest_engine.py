@@ -0,0 +1,141 @@
+"""
+Event-indexed quest progress.
+
+Each quest type is registered with the event it listens to and whether it is
+narrowed by resource and/or creature family. A user's open quests are
+indexed by (event, resource, family) — None meaning "any" — so an event only
+touches the quests subscribed to it instead of walking the whole list. Below
+INDEX_MIN_QUESTS building the index costs more than it saves, so short lists
+(the usual daily set) are scanned with scan_event() instead.
+
+Quest dicts are never mutated: progressed quests are replaced with updated
+copies, since the list may share dicts with a buffered save.
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+QuestKey = tuple[str, Optional[str], Optional[str]]
+
+INDEX_MIN_QUESTS = 16
+
+
+@dataclass(frozen=True)
+class QuestType:
+    event: str
+    by_resource: bool = False    # progress by the targetResource amount in the event
+    by_family: bool = False      # only events for targetFamily count
+    # Custom progress for the event; defaults to the resource amount or the event amount
+    progress: Optional[Callable[[dict, "QuestEvent"], int]] = None
+
+    def key(self, quest: dict) -> QuestKey:
+        return (
+            self.event,
+            quest.get("targetResource", "leaves") if self.by_resource else None,
+            quest.get("targetFamily") if self.by_family else None,
+        )
+
+
+@dataclass(frozen=True)
+class QuestEvent:
+    type: str
+    amount: int = 0
+    family: str = ""
+    resources: Optional[dict] = None
+
+
+QUEST_TYPES: dict[str, QuestType] = {}
+
+
+def register_quest_type(name: str, quest_type: QuestType) -> None:
+    QUEST_TYPES[name] = quest_type
+
+
+register_quest_type("merge",        QuestType("merge"))
+register_quest_type("collect",      QuestType("collect", by_resource=True))
+register_quest_type("collect_type", QuestType("collect", by_resource=True, by_family=True))
+
+
+# ─── Index ────────────────────────────────────────────────────────────────────
+class QuestIndex:
+    """Positions of a quest list's open quests, by subscription key and by id."""
+    __slots__ = ("by_key", "by_id")
+
+    def __init__(self, quests: list[dict]):
+        self.by_key: dict[QuestKey, list[int]] = {}
+        self.by_id: dict[str, int] = {}
+        for pos, q in enumerate(quests):
+            self.by_id.setdefault(q.get("id"), pos)
+            quest_type = QUEST_TYPES.get(q.get("type"))
+            if quest_type is None or q.get("completed") or q.get("claimedAt"):
+                continue
+            self.by_key.setdefault(quest_type.key(q), []).append(pos)
+
+    def subscribers(self, event: QuestEvent) -> list[tuple[QuestKey, list[int]]]:
+        """(key, positions) for every key the event matches."""
+        families = (None, event.family) if event.family else (None,)
+        resources = (None, *event.resources) if event.resources else (None,)
+        found = []
+        for res in resources:
+            for fam in families:
+                positions = self.by_key.get((event.type, res, fam))
+                if positions:
+                    found.append(((event.type, res, fam), positions))
+        return found
+
+
+def _advanced(q: dict, gained: int) -> Optional[dict]:
+    """A copy of q with `gained` progress, or None if it made none."""
+    if not gained and q["currentAmount"] < q["targetAmount"]:
+        return None
+    current = min(q["currentAmount"] + gained, q["targetAmount"])
+    return {**q, "currentAmount": current, "completed": current >= q["targetAmount"]}
+
+
+def apply_event(quests: list[dict], index: QuestIndex, event: QuestEvent) -> None:
+    """Advance the quests subscribed to event, in place on the list."""
+    for key, positions in index.subscribers(event):
+        res = key[1]
+        default_gain = event.resources.get(res, 0) if res is not None else event.amount
+        done = []
+        for pos in positions:
+            q = quests[pos]
+            progress = QUEST_TYPES[q["type"]].progress
+            q = _advanced(q, progress(q, event) if progress is not None else default_gain)
+            if q is None:
+                continue
+            quests[pos] = q
+            if q["completed"]:
+                done.append(pos)
+        if done:
+            # Completed quests stop listening
+            index.by_key[key] = [p for p in positions if p not in done]
+
+
+def scan_event(quests: list[dict], event_type: str, amount: int = 0, family: str = "", resources: dict = None) -> None:
+    """
+    apply_event without an index, in one pass over a short list. Takes the
+    event's fields; a QuestEvent is only built for custom progress functions.
+    """
+    earned = resources or {}
+    for pos, q in enumerate(quests):
+        if q.get("completed") or q.get("claimedAt"):
+            continue
+        quest_type = QUEST_TYPES.get(q.get("type"))
+        if quest_type is None or quest_type.event != event_type:
+            continue
+        gained = amount
+        if quest_type.by_resource:
+            res = q.get("targetResource", "leaves")
+            if res is not None:
+                if res not in earned:
+                    continue
+                gained = earned[res]
+        if quest_type.by_family:
+            fam = q.get("targetFamily")
+            if fam is not None and (fam != family or not fam):
+                continue
+        if quest_type.progress is not None:
+            gained = quest_type.progress(q, QuestEvent(event_type, amount, family, resources))
+        q = _advanced(q, gained)
+        if q is not None:
+            quests[pos] = q
@@ -1,17 +1,19 @@
-import json
 import time
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..models import User, ReferralReward
+from ..save_buffer import load_state, load_versioned
+from ..state_codec import encode_state
+from ..collection import expand_state
+from ..serializer import FastJSONResponse
 from ..schemas import AuthRequest, AuthResponse
-from ..config import get_settings
-from ..telegram_auth import get_init_data_header, parse_user_from_init_data
+from ..config import get_settings, session_secret
+from ..telegram_auth import get_init_data_header, parse_user_from_init_data, issue_session_token
 from ..game_service import (
     default_game_state, make_referral_code,
     apply_referral_reward, apply_referrer_reward,
-    refresh_quests_if_needed,
 )
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -52,7 +54,7 @@ def auth_telegram(body: AuthRequest, request: Request, db: Session = Depends(get
             language_code=tg_user.get("language_code", "en"),
             photo_url=tg_user.get("photo_url"),
             referral_code=referral_code,
-            game_state=json.dumps(state),
+            game_state=encode_state(state),
             created_at=now_ms,
             last_seen=now_ms,
         )
@@ -86,40 +88,50 @@ def auth_telegram(body: AuthRequest, request: Request, db: Session = Depends(get
                 db.add(reward)
 
                 # Apply rewards
-                new_user_state = json.loads(user.game_state)
+                new_user_state = load_state(user)
                 new_user_state = apply_referral_reward(new_user_state)
-                new_user_state["referredBy"] = referrer.telegram_id
-                user.game_state = json.dumps(new_user_state)
+                new_user_state.extra["referredBy"] = referrer.telegram_id
+                user.game_state = encode_state(new_user_state)
                 user.referred_by = referrer.telegram_id
 
-                referrer_state = json.loads(referrer.game_state)
+                referrer_state = load_state(referrer)
                 referrer_state = apply_referrer_reward(referrer_state)
-                referrer.game_state = json.dumps(referrer_state)
+                referrer.game_state = encode_state(referrer_state)
                 referrer.referral_count = (referrer.referral_count or 0) + 1
 
                 db.commit()
                 db.refresh(user)
 
-    # Parse and refresh quests if needed
-    state = json.loads(user.game_state)
-    state = refresh_quests_if_needed(state)
+    # Today's quests are rolled in on load; nothing to write back
+    state, version = load_versioned(user)
+    state = expand_state(state)
     state["referralCode"] = user.referral_code or ""
     state["subscription"] = user.subscription or "none"
+    state["subscriptionExpires"] = user.subscription_expires
     state["noAds"] = user.no_ads or False
 
-    # Save if quests refreshed
-    user.game_state = json.dumps(state)
-    db.commit()
-
-    return AuthResponse(
-        telegramId=user.telegram_id,
-        username=user.username or "",
-        firstName=user.first_name,
-        languageCode=user.language_code or "en",
-        photoUrl=user.photo_url,
-        gameState=state,
-        isNewUser=is_new_user,
-        referralCode=user.referral_code or "",
-        createdAt=user.created_at,
-        lastSeen=user.last_seen,
-    )
+    # Short-lived token so later requests skip initData verification; none
+    # (the client keeps sending initData) while SECRET_KEY is the dev default
+    session_token, session_expires_at = "", 0
+    secret = session_secret(settings)
+    if secret:
+        session_token, session_expires_at = issue_session_token(
+            user.id, user.telegram_id, secret, settings.session_token_ttl_sec,
+        )
+
+    # Shape matches AuthResponse; returned directly to skip re-encoding the state
+    return FastJSONResponse({
+        "telegramId": user.telegram_id,
+        "username": user.username or "",
+        "firstName": user.first_name,
+        "languageCode": user.language_code or "en",
+        "photoUrl": user.photo_url,
+        "gameState": state,
+        "isNewUser": is_new_user,
+        "referralCode": user.referral_code or "",
+        "createdAt": user.created_at,
+        "lastSeen": user.last_seen,
+        "sessionToken": session_token,
+        "sessionExpiresAt": session_expires_at,
+        "stateVersion": version,
+    })
@@ -1,103 +1,215 @@
-import json
 import time
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_async_db
+from ..dependencies import current_user_async
 from ..models import User
-from ..schemas import SaveStateRequest, MergeRequest, CollectRequest
+from ..save_buffer import load_state, load_versioned, current_version, next_version, save_buffer
+from ..state_codec import encode_state
+from ..serializer import FastJSONResponse
+from ..http_cache import make_etag, etag_matches, not_modified, cache_headers
+from ..schemas import SaveStateRequest, PatchStateRequest, MergeRequest, CollectRequest, ActionsRequest
 from ..config import get_settings
-from ..telegram_auth import get_init_data_header, parse_user_from_init_data
-from ..game_service import perform_merge, perform_collect
+from ..game_service import perform_merge, perform_collect, collect_all, merge_all, apply_actions, quest_day
+from ..game_state import GameState
+from ..collection import expand_state
+from ..json_patch import apply_patch, JsonPatchError
 from ..ai_service import generate_creature_name
 
 router = APIRouter(prefix="/game", tags=["game"])
 settings = get_settings()
 
 
-def get_current_user(request: Request, db: Session) -> User:
-    init_data = get_init_data_header(request)
-    allow_dev = not settings.telegram_bot_token or settings.environment == "development"
-    parsed = parse_user_from_init_data(init_data, settings.telegram_bot_token, allow_dev=allow_dev)
-    tg_id = parsed["user"]["id"]
-    user = db.query(User).filter(User.telegram_id == tg_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found. Auth first.")
-    return user
+# Everything the /state response depends on besides the blob itself
+_STATE_COLUMNS = (User.state_version, User.referral_code, User.subscription, User.subscription_expires, User.no_ads)
+
+
+def _state_etag(user: User, version: int) -> str:
+    # The day is part of it because daily quests roll over without a version bump
+    return make_etag("state", user.telegram_id, version, quest_day(), user.referral_code, user.subscription, user.subscription_expires, user.no_ads)
 
 
 @router.get("/state")
-def get_state(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    state = json.loads(user.game_state)
+async def get_state(request: Request, user: User = Depends(current_user_async(*_STATE_COLUMNS)), db: AsyncSession = Depends(get_async_db)):
+    etag = _state_etag(user, current_version(user))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # The blob is deferred; load it (with a matching version) only on a miss
+    if save_buffer.peek(user.telegram_id) is None:
+        await db.refresh(user, ["game_state", "state_version"])
+    state, version = load_versioned(user)
+    state = expand_state(state)
     state["referralCode"] = user.referral_code or ""
     state["subscription"] = user.subscription or "none"
+    state["subscriptionExpires"] = user.subscription_expires
     state["noAds"] = user.no_ads or False
-    return state
+    headers = {"X-State-Version": str(version), **cache_headers(_state_etag(user, version))}
+    return FastJSONResponse(state, headers=headers)
 
 
 @router.post("/save")
-def save_state(body: SaveStateRequest, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-
+async def save_state(body: SaveStateRequest, user: User = Depends(current_user_async()), db: AsyncSession = Depends(get_async_db)):
     # Basic sanity — don't accept nonsense
     state = body.state
     if not isinstance(state.get("grid"), list):
         raise HTTPException(status_code=400, detail="Invalid state")
 
+    version = await _store_client_state(user, state, db)
+    return {"saved": True, "version": version}
+
+
+@router.patch("/state")
+async def patch_state(body: PatchStateRequest, user: User = Depends(current_user_async()), db: AsyncSession = Depends(get_async_db)):
+    """
+    Delta save: apply RFC 6902 operations to the stored state. Rejected with
+    409 (current version in X-State-Version) unless base_version is current,
+    in which case the client should rebase or fall back to /game/save.
+    """
+    state, version = load_versioned(user)
+    if body.base_version != version:
+        _version_conflict(version)
+
+    try:
+        # Client patches are diffs of the API shape
+        state = apply_patch(expand_state(state), body.patch)
+    except JsonPatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not isinstance(state, dict) or not isinstance(state.get("grid"), list):
+        raise HTTPException(status_code=400, detail="Invalid state")
+
+    version = await _store_client_state(user, state, db, base_version=version)
+    return {"saved": True, "version": version}
+
+
+def _version_conflict(version: int):
+    raise HTTPException(status_code=409, detail="State version mismatch", headers={"X-State-Version": str(version)})
+
+
+async def _store_client_state(user: User, state: dict, db: AsyncSession, base_version: Optional[int] = None) -> int:
+    """
+    Write a client-built state (full or patched). Returns its new version.
+    With base_version, the write only happens if the stored state is still
+    at that version (409 otherwise).
+    """
     # Preserve server-side values
     state["referralCode"] = user.referral_code or ""
     state["subscription"] = user.subscription or "none"
+    state["subscriptionExpires"] = user.subscription_expires
     state["noAds"] = user.no_ads or False
     state["lastOnline"] = int(time.time() * 1000)
 
-    user.game_state = json.dumps(state)
+    if settings.save_coalescing:
+        version = next_version(user)
+        save_buffer.enqueue(user.telegram_id, user.game_state, state, version)
+        return version
+
+    if base_version is not None:
+        # Check and write in one statement: a concurrent request that read the
+        # same version may have committed since this one read it
+        result = await db.execute(
+            update(User)
+            .where(User.id == user.id, User.state_version == base_version)
+            .values(game_state=encode_state(state), last_seen=int(time.time() * 1000), state_version=base_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await db.rollback()
+            await db.refresh(user, ["state_version"])
+            _version_conflict(user.state_version or 0)
+        await db.commit()
+        return base_version + 1
+
+    user.game_state = encode_state(state)
     user.last_seen = int(time.time() * 1000)
-    db.commit()
-    return {"saved": True}
+    await db.commit()
+    return user.state_version
 
 
 @router.post("/merge")
-async def merge(body: MergeRequest, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    state = json.loads(user.game_state)
+async def merge(body: MergeRequest, user: User = Depends(current_user_async()), db: AsyncSession = Depends(get_async_db)):
+    state = GameState.from_dict(load_state(user))
+    merged = state.creature(body.from_id)
 
     try:
         new_state, result = perform_merge(state, body.from_id, body.to_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    new_state.last_online = int(time.time() * 1000)
+    user.game_state = encode_state(new_state)
+    await db.commit()
+
     # Try to get AI name (non-blocking)
     ai_name = None
     try:
         ai_name = await generate_creature_name(
-            # Find the merged creature family from from_id's original
-            next(c["family"] for c in state["grid"] if c and c["id"] == body.from_id),
+            merged["family"],
             result["newLevel"],
             user.language_code or "en",
         )
     except Exception:
         pass
 
-    new_state["lastOnline"] = int(time.time() * 1000)
-    user.game_state = json.dumps(new_state)
-    db.commit()
-
     return {**result, "aiName": ai_name}
 
 
 @router.post("/collect")
-def collect(body: CollectRequest, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    state = json.loads(user.game_state)
+async def collect(body: CollectRequest, user: User = Depends(current_user_async()), db: AsyncSession = Depends(get_async_db)):
+    state = load_state(user)
 
     try:
         new_state, earned = perform_collect(state, body.creature_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    new_state["lastOnline"] = int(time.time() * 1000)
-    user.game_state = json.dumps(new_state)
-    db.commit()
+    new_state.last_online = int(time.time() * 1000)
+    user.game_state = encode_state(new_state)
+    await db.commit()
 
     return {"resources": earned}
+
+
+@router.post("/collect-all")
+async def collect_everything(user: User = Depends(current_user_async()), db: AsyncSession = Depends(get_async_db)):
+    new_state, result = collect_all(load_state(user))
+
+    if result["collected"]:
+        new_state.last_online = int(time.time() * 1000)
+        user.game_state = encode_state(new_state)
+        await db.commit()
+
+    return result
+
+
+@router.post("/merge-all")
+async def merge_everything(user: User = Depends(current_user_async()), db: AsyncSession = Depends(get_async_db)):
+    new_state, result = merge_all(load_state(user))
+
+    if result["merges"]:
+        new_state.last_online = int(time.time() * 1000)
+        user.game_state = encode_state(new_state)
+        await db.commit()
+
+    return result
+
+
+@router.post("/actions")
+async def actions(body: ActionsRequest, user: User = Depends(current_user_async()), db: AsyncSession = Depends(get_async_db)):
+    """
+    Apply a burst of merges / collects / buys in order with a single write.
+    Stops at the first failing action; the ones before it are kept.
+    """
+    state = GameState.from_dict(load_state(user))
+    new_state, results, error = apply_actions(state, [a.model_dump(exclude_none=True) for a in body.actions])
+
+    if results:
+        new_state.last_online = int(time.time() * 1000)
+        user.game_state = encode_state(new_state)
+        await db.commit()
+
+    return {"results": results, "applied": len(results), "error": error}
@@ -8,52 +8,44 @@ Flow:
 4. Telegram sends successful_payment to bot webhook → bot notifies backend
 5. Frontend calls POST /payments/verify to apply purchase effects
 """
-import json
 import time
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_db, get_async_db
+from ..dependencies import current_user, current_user_async
 from ..models import User, Purchase
+from ..save_buffer import load_state
+from ..state_codec import encode_state
+from ..serializer import dumps, loads
 from ..schemas import CreateInvoiceRequest, CreateInvoiceResponse, VerifyPaymentRequest
 from ..config import get_settings
-from ..telegram_auth import get_init_data_header, parse_user_from_init_data
+from ..metrics import OUTBOUND_HTTP_SECONDS, timed
 from ..game_service import apply_stars_purchase
-from ..game_data import SUBSCRIPTION_PRICES, SHOP_ITEMS
+from ..game_data import SUBSCRIPTION_PRICES, SUBSCRIPTION_DURATION_MS, SHOP_ITEMS
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 settings = get_settings()
 
 
-def get_current_user(request: Request, db: Session) -> User:
-    init_data = get_init_data_header(request)
-    allow_dev = not settings.telegram_bot_token or settings.environment == "development"
-    parsed = parse_user_from_init_data(init_data, settings.telegram_bot_token, allow_dev=allow_dev)
-    tg_id = parsed["user"]["id"]
-    user = db.query(User).filter(User.telegram_id == tg_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 @router.post("/create-invoice", response_model=CreateInvoiceResponse)
-async def create_invoice(body: CreateInvoiceRequest, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-
+async def create_invoice(body: CreateInvoiceRequest, user: User = Depends(current_user_async(User.telegram_id))):
     if not settings.telegram_bot_token:
         raise HTTPException(status_code=503, detail="Payments not configured")
 
     # Build Telegram Stars invoice via Bot API
     prices = [{"label": body.title, "amount": body.amount}]
 
-    async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient() as client, timed(OUTBOUND_HTTP_SECONDS, "telegram"):
         resp = await client.post(
             f"https://api.telegram.org/bot{settings.telegram_bot_token}/createInvoiceLink",
             json={
                 "title": body.title[:32],
                 "description": body.description[:255],
-                "payload": json.dumps({"item_id": body.item_id, "user_id": user.telegram_id}),
+                "payload": dumps({"item_id": body.item_id, "user_id": user.telegram_id}).decode(),
                 "currency": "XTR",          # Telegram Stars
                 "prices": prices,
             },
@@ -71,12 +63,11 @@ async def create_invoice(body: CreateInvoiceRequest, request: Request, db: Sessi
 
 
 @router.post("/verify")
-def verify_payment(body: VerifyPaymentRequest, request: Request, db: Session = Depends(get_db)):
+def verify_payment(body: VerifyPaymentRequest, user: User = Depends(current_user()), db: Session = Depends(get_db)):
     """
     Called after Telegram confirms payment. Apply item to user account.
     In production, verify charge_id against Telegram's records.
     """
-    user = get_current_user(request, db)
 
     # Record purchase
     purchase = Purchase(
@@ -89,34 +80,34 @@ def verify_payment(body: VerifyPaymentRequest, request: Request, db: Session = D
     )
     db.add(purchase)
 
-    state = json.loads(user.game_state)
+    state = load_state(user)
 
     # Handle subscription
     if body.item_id in SUBSCRIPTION_PRICES:
         tier = body.item_id
         user.subscription = tier
-        # 30 days
-        user.subscription_expires = int(time.time() * 1000) + 30 * 24 * 3600 * 1000
+        user.subscription_expires = int(time.time() * 1000) + SUBSCRIPTION_DURATION_MS
         state["subscription"] = tier
+        state["subscriptionExpires"] = user.subscription_expires
         if tier == "enchanted":
             user.no_ads = True
             state["noAds"] = True
 
     else:
         # Apply item effect
-        state = apply_stars_purchase(state, body.item_id)
+        state = apply_stars_purchase(state, body.item_id).to_dict()
         if body.item_id == "no_ads":
             user.no_ads = True
             state["noAds"] = True
 
-    user.game_state = json.dumps(state)
+    user.game_state = encode_state(state)
     db.commit()
 
     return {"applied": True}
 
 
 @router.post("/webhook")
-async def payment_webhook(request: Request, db: Session = Depends(get_db)):
+async def payment_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Receive Telegram Bot updates (payments) via webhook.
     Register with: POST https://api.telegram.org/bot<TOKEN>/setWebhook
@@ -131,7 +122,7 @@ async def payment_webhook(request: Request, db: Session = Depends(get_db)):
     if pre_checkout_query:
         # Always approve pre-checkout (validate stock, limits here if needed)
         query_id = pre_checkout_query["id"]
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient() as client, timed(OUTBOUND_HTTP_SECONDS, "telegram"):
             await client.post(
                 f"https://api.telegram.org/bot{settings.telegram_bot_token}/answerPreCheckoutQuery",
                 json={"pre_checkout_query_id": query_id, "ok": True},
@@ -141,7 +132,7 @@ async def payment_webhook(request: Request, db: Session = Depends(get_db)):
     if successful_payment:
         payload_str = successful_payment.get("invoice_payload", "{}")
         try:
-            payload = json.loads(payload_str)
+            payload = loads(payload_str)
         except Exception:
             return {"ok": True}
 
@@ -150,7 +141,7 @@ async def payment_webhook(request: Request, db: Session = Depends(get_db)):
         charge_id = successful_payment.get("telegram_payment_charge_id", "")
 
         if item_id and user_id:
-            user = db.query(User).filter(User.telegram_id == user_id).first()
+            user = (await db.execute(select(User).where(User.telegram_id == user_id))).scalars().first()
             if user:
                 purchase = Purchase(
                     telegram_id=user_id,
@@ -162,15 +153,16 @@ async def payment_webhook(request: Request, db: Session = Depends(get_db)):
                 )
                 db.add(purchase)
 
-                state = json.loads(user.game_state)
+                state = load_state(user)
                 if item_id in SUBSCRIPTION_PRICES:
                     user.subscription = item_id
-                    user.subscription_expires = int(time.time() * 1000) + 30 * 24 * 3600 * 1000
+                    user.subscription_expires = int(time.time() * 1000) + SUBSCRIPTION_DURATION_MS
                     state["subscription"] = item_id
+                    state["subscriptionExpires"] = user.subscription_expires
                 else:
-                    state = apply_stars_purchase(state, item_id)
+                    state = apply_stars_purchase(state, item_id).to_dict()
 
-                user.game_state = json.dumps(state)
-                db.commit()
+                user.game_state = encode_state(state)
+                await db.commit()
 
     return {"ok": True}
@@ -1,50 +1,40 @@
-import json
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from ..database import get_db
+from ..dependencies import current_user
 from ..models import User
+from ..save_buffer import load_state, current_version
+from ..state_codec import encode_state
+from ..serializer import FastJSONResponse
+from ..http_cache import make_etag, etag_matches, not_modified, cache_headers
 from ..schemas import ClaimQuestRequest, ClaimQuestResponse
 from ..config import get_settings
-from ..telegram_auth import get_init_data_header, parse_user_from_init_data
-from ..game_service import claim_quest as svc_claim_quest, refresh_quests_if_needed
+from ..game_service import claim_quest as svc_claim_quest, quest_day
 
 router = APIRouter(prefix="/quests", tags=["quests"])
 settings = get_settings()
 
 
-def get_current_user(request: Request, db: Session) -> User:
-    init_data = get_init_data_header(request)
-    allow_dev = not settings.telegram_bot_token or settings.environment == "development"
-    parsed = parse_user_from_init_data(init_data, settings.telegram_bot_token, allow_dev=allow_dev)
-    tg_id = parsed["user"]["id"]
-    user = db.query(User).filter(User.telegram_id == tg_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 @router.get("/daily")
-def get_daily_quests(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    state = json.loads(user.game_state)
-    state = refresh_quests_if_needed(state)
-    user.game_state = json.dumps(state)
-    db.commit()
-    return state.get("dailyQuests", [])
+def get_daily_quests(request: Request, user: User = Depends(current_user())):
+    # Pure read: a new day's quests are derived on load, not written here
+    etag = make_etag("quests", user.telegram_id, current_version(user), quest_day())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(load_state(user)["dailyQuests"], headers=cache_headers(etag))
 
 
 @router.post("/claim")
-def claim_quest(body: ClaimQuestRequest, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    state = json.loads(user.game_state)
+def claim_quest(body: ClaimQuestRequest, user: User = Depends(current_user()), db: Session = Depends(get_db)):
+    state = load_state(user)
 
     try:
         new_state, reward = svc_claim_quest(state, body.quest_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    user.game_state = json.dumps(new_state)
+    user.game_state = encode_state(new_state)
     db.commit()
 
     return ClaimQuestResponse(rewards=reward)
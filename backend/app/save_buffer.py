@@ -0,0 +1,205 @@
+"""
+Write-behind buffer for /game/save.
+
+The client posts its whole GameState every few seconds. Instead of a commit
+per post we keep only the latest pending state per telegram_id and flush
+dirty users in one batched transaction (executemany) every
+`save_flush_interval_sec`, or sooner once `save_flush_batch_size` users are
+dirty. Anything that reads a user's state goes through load_state() so it
+sees the pending save.
+
+Each buffered save remembers the blob it was based on, and the flush is a
+compare-and-swap on that blob: if a merge, purchase or referral reward
+rewrote the row in the meantime, the stale save is dropped instead of
+clobbering it. Such writes were made on top of load_state(), so the save is
+already folded in, and the pending entry is discarded once they commit.
+The buffer is per process.
+
+Every write of a user's game_state bumps User.state_version: buffered saves
+carry the version they will be written with, and ORM commits are bumped by
+the before_flush hook below. load_versioned() returns the state together
+with the version a delta save must be based on.
+"""
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from sqlalchemy import bindparam, event, inspect, update
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .models import User
+from .state_codec import encode_state, decode_state
+from .game_service import roll_daily_quests
+
+settings = get_settings()
+
+
+@dataclass
+class _PendingSave:
+    base: Union[str, bytes]   # game_state blob this save was made on top of
+    state: dict
+    last_seen: int
+    version: int
+    blob: bytes = b""         # encoded state, filled in when the batch is taken
+
+
+class SaveCoalescer:
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self._pending: dict[int, _PendingSave] = {}
+        self._in_flight: dict[int, _PendingSave] = {}
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {"enqueued": 0, "coalesced": 0, "flushed": 0, "conflicts": 0, "batches": 0}
+
+    # ─── Producer side ────────────────────────────────────────────────────────
+    def enqueue(self, telegram_id: int, base_blob: Union[str, bytes], state: dict, version: int) -> None:
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            self.stats["enqueued"] += 1
+            existing = self._pending.get(telegram_id)
+            if existing is not None:
+                self.stats["coalesced"] += 1
+                base = existing.base
+            elif telegram_id in self._in_flight:
+                base = self._in_flight[telegram_id].blob
+            else:
+                base = base_blob
+            self._pending[telegram_id] = _PendingSave(base, state, now_ms, version)
+            full = len(self._pending) >= self.batch_size
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+
+    def peek(self, telegram_id: int) -> Optional[dict]:
+        entry = self._entry(telegram_id)
+        return entry.state if entry else None
+
+    def pending_version(self, telegram_id: int) -> Optional[int]:
+        entry = self._entry(telegram_id)
+        return entry.version if entry else None
+
+    def _entry(self, telegram_id: int) -> Optional[_PendingSave]:
+        with self._lock:
+            return self._pending.get(telegram_id) or self._in_flight.get(telegram_id)
+
+    def discard(self, telegram_id: int) -> None:
+        with self._lock:
+            self._pending.pop(telegram_id, None)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # ─── Flushing ─────────────────────────────────────────────────────────────
+    async def flush(self, engine) -> int:
+        """Write every dirty user in one transaction. Returns rows written."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._in_flight = batch
+        for entry in batch.values():
+            entry.blob = encode_state(entry.state)
+
+        table = User.__table__
+        stmt = (
+            update(table)
+            .where(table.c.telegram_id == bindparam("tg"), table.c.game_state == bindparam("base"))
+            .values(game_state=bindparam("blob"), last_seen=bindparam("ls"), state_version=bindparam("ver"))
+        )
+        params = [
+            {"tg": tg, "base": e.base, "blob": e.blob, "ls": e.last_seen, "ver": e.version}
+            for tg, e in batch.items()
+        ]
+        try:
+            async with engine.begin() as conn:
+                result = await conn.execute(stmt, params)
+        except BaseException:
+            # Put the batch back unless a newer save already replaced it; this
+            # includes cancellation, e.g. shutdown stopping the flush loop mid-write
+            with self._lock:
+                for tg, entry in batch.items():
+                    newer = self._pending.setdefault(tg, entry)
+                    # A save made during this flush was based on entry.blob,
+                    # which never got written; rebase it on what the row holds
+                    newer.base = entry.base
+                self._in_flight = {}
+            raise
+
+        written = result.rowcount if result.rowcount >= 0 else len(params)
+        with self._lock:
+            self._in_flight = {}
+            self.stats["batches"] += 1
+            self.stats["flushed"] += written
+            self.stats["conflicts"] += len(params) - written
+        return written
+
+    async def run(self, engine, interval_sec: float) -> None:
+        """Background loop: flush on the interval or when the batch fills up."""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush(engine)
+            except Exception as e:
+                print(f"⚠️ Save flush failed: {e}")
+
+
+save_buffer = SaveCoalescer(settings.save_flush_batch_size)
+
+
+def load_state(user: User) -> dict:
+    """
+    The user's game state, including a save that has not been flushed yet,
+    with today's daily quests rolled in.
+    """
+    return load_versioned(user)[0]
+
+
+def load_versioned(user: User) -> tuple[dict, int]:
+    """load_state() plus the state_version it corresponds to."""
+    entry = save_buffer._entry(user.telegram_id)
+    if entry is not None:
+        state, version = dict(entry.state), entry.version
+    else:
+        state, version = decode_state(user.game_state), user.state_version or 0
+    return roll_daily_quests(state, user.telegram_id), version
+
+
+def current_version(user: User) -> int:
+    """Version of the state load_state() would return, without decoding it."""
+    pending = save_buffer.pending_version(user.telegram_id)
+    return pending if pending is not None else user.state_version or 0
+
+
+def next_version(user: User) -> int:
+    """Version the user's next game_state write gets."""
+    return max(user.state_version or 0, save_buffer.pending_version(user.telegram_id) or 0) + 1
+
+
+# ─── Session hooks ────────────────────────────────────────────────────────────
+# Any ORM commit that rewrites a user's game_state bumps its version and
+# supersedes their pending save.
+@event.listens_for(Session, "before_flush")
+def _track_state_writes(session, _flush_context, _instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, User) and inspect(obj).attrs.game_state.history.has_changes():
+            obj.state_version = next_version(obj)
+            session.info.setdefault("state_writes", set()).add(obj.telegram_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _discard_superseded_saves(session):
+    for telegram_id in session.info.pop("state_writes", ()):
+        save_buffer.discard(telegram_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_state_writes(session):
+    session.info.pop("state_writes", None)
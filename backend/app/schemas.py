@@ -1,5 +1,10 @@
-from pydantic import BaseModel
-from typing import Optional, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Any, Literal, Union
+
+from .game_data import MAX_BATCH_ACTIONS
+
+# Creature ids are per-user ints; "c_…" strings from older saves are still accepted
+CreatureId = Union[int, str]
 
 
 # ─── Auth ─────────────────────────────────────────────────────────────────────
@@ -18,6 +23,9 @@ class AuthResponse(BaseModel):
     referralCode: str
     createdAt: int
     lastSeen: int
+    sessionToken: str       # "" when tokens are disabled (default SECRET_KEY outside development)
+    sessionExpiresAt: int   # unix seconds
+    stateVersion: int
 
 
 # ─── Game ─────────────────────────────────────────────────────────────────────
@@ -25,17 +33,34 @@ class SaveStateRequest(BaseModel):
     state: dict
 
 
+class PatchStateRequest(BaseModel):
+    base_version: int
+    patch: list[dict]   # RFC 6902 operations
+
+
 class MergeRequest(BaseModel):
-    from_id: str
-    to_id: str
+    from_id: CreatureId
+    to_id: CreatureId
 
 
 class CollectRequest(BaseModel):
-    creature_id: str
+    creature_id: CreatureId
+
+
+class GameAction(BaseModel):
+    type: Literal["merge", "collect", "buy", "collect_all", "merge_all"]
+    from_id: Optional[CreatureId] = None       # merge
+    to_id: Optional[CreatureId] = None         # merge
+    creature_id: Optional[CreatureId] = None   # collect
+    item_id: Optional[str] = None       # buy
+
+
+class ActionsRequest(BaseModel):
+    actions: list[GameAction] = Field(min_length=1, max_length=MAX_BATCH_ACTIONS)
 
 
 class MergeResponse(BaseModel):
-    newCreatureId: str
+    newCreatureId: int
     newLevel: int
     xpGained: int
     aiName: Optional[str] = None
@@ -48,8 +73,9 @@ class BuyRequest(BaseModel):
 
 class BuyResponse(BaseModel):
     success: bool
-    newCreatureId: Optional[str] = None
+    newCreatureId: Optional[int] = None
     newSlots: Optional[int] = None
+    boostUntil: Optional[int] = None    # booster end, unix ms
     message: str
 
 
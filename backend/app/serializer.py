@@ -0,0 +1,54 @@
+"""
+JSON engine used for game_state (de)serialization and API responses.
+
+Uses orjson when it is installed (JSON_ENGINE=auto, the default), otherwise
+the stdlib json module. Both produce compact UTF-8 bytes, so stored blobs
+and responses look the same whichever engine wrote them.
+"""
+import json
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+
+from .config import get_settings
+
+try:
+    import orjson
+except ImportError:  # optional — stdlib fallback
+    orjson = None
+
+settings = get_settings()
+
+
+def _resolve_engine(name: str) -> str:
+    if name == "auto":
+        return "orjson" if orjson is not None else "json"
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_ENGINE=orjson but orjson is not installed")
+    return name
+
+
+ENGINE = _resolve_engine(settings.json_engine)
+
+if ENGINE == "orjson":
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    App-wide default response class. Return it directly from hot routes to
+    skip FastAPI's jsonable_encoder pass over plain dict/list payloads.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,103 @@
+"""
+Storage codec for User.game_state.
+
+Stored blobs are a one-byte format marker followed by the payload:
+
+    0x01  zlib-compressed JSON
+    0x02  zstd-compressed JSON
+    0x03  zstd-compressed JSON using the trained dictionary
+
+Rows written before the codec existed are plain JSON text (they start with
+"{") and are still decoded; they are rewritten in the configured format the
+next time the state is saved.
+"""
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+from .config import get_settings
+from .game_state import GameState
+from .collection import compact_state
+from .metrics import STATE_CODEC_SECONDS, timed
+from .serializer import dumps, loads
+
+try:
+    import zstandard
+except ImportError:  # optional — zlib is always available
+    zstandard = None
+
+FORMAT_ZLIB = 0x01
+FORMAT_ZSTD = 0x02
+FORMAT_ZSTD_DICT = 0x03
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+settings = get_settings()
+
+
+# ─── zstd ─────────────────────────────────────────────────────────────────────
+@lru_cache(maxsize=1)
+def _zstd_dict():
+    path = settings.state_zstd_dict_path
+    if not path:
+        return None
+    return zstandard.ZstdCompressionDict(Path(path).read_bytes())
+
+
+@lru_cache(maxsize=4)
+def _zstd_compressor(with_dict: bool):
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=_zstd_dict() if with_dict else None)
+
+
+@lru_cache(maxsize=4)
+def _zstd_decompressor(with_dict: bool):
+    return zstandard.ZstdDecompressor(dict_data=_zstd_dict() if with_dict else None)
+
+
+def train_zstd_dictionary(states: list[dict], size: int = 16 * 1024) -> bytes:
+    """Train a zstd dictionary on sample states; write it to STATE_ZSTD_DICT_PATH."""
+    if zstandard is None:
+        raise RuntimeError("zstandard is not installed")
+    samples = [dumps(s) for s in states]
+    return zstandard.train_dictionary(size, samples).as_bytes()
+
+
+# ─── Codec ────────────────────────────────────────────────────────────────────
+def encode_state(state: Union[GameState, dict], codec: str = None) -> bytes:
+    with timed(STATE_CODEC_SECONDS, "encode"):
+        return _encode(state, codec or settings.state_codec)
+
+
+def _encode(state: Union[GameState, dict], codec: str) -> bytes:
+    raw = dumps(state.to_dict() if isinstance(state, GameState) else compact_state(state))
+
+    if codec == "json":
+        return raw
+    if codec == "zstd" and zstandard is not None:
+        with_dict = _zstd_dict() is not None
+        marker = FORMAT_ZSTD_DICT if with_dict else FORMAT_ZSTD
+        return bytes((marker,)) + _zstd_compressor(with_dict).compress(raw)
+    return bytes((FORMAT_ZLIB,)) + zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decode_state(blob: Union[str, bytes]) -> dict:
+    with timed(STATE_CODEC_SECONDS, "decode"):
+        return _decode(blob)
+
+
+def _decode(blob: Union[str, bytes]) -> dict:
+    if isinstance(blob, str):
+        return loads(blob)
+    if not blob:
+        return {}
+
+    marker = blob[0]
+    if marker == FORMAT_ZLIB:
+        return loads(zlib.decompress(blob[1:]))
+    if marker in (FORMAT_ZSTD, FORMAT_ZSTD_DICT):
+        if zstandard is None:
+            raise RuntimeError("State was stored with zstd but zstandard is not installed")
+        return loads(_zstd_decompressor(marker == FORMAT_ZSTD_DICT).decompress(blob[1:]))
+    return loads(blob)
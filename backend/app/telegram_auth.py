@@ -1,17 +1,96 @@
 """
 Telegram WebApp initData HMAC-SHA256 verification.
 Spec: https://core.telegram.org/bots/webapps#validating-data-received-via-the-mini-app
+
+The client sends the same initData header on every request for up to an hour,
+so successful verifications are cached (keyed on a hash of the header) until
+the data itself expires at auth_date + INIT_DATA_TTL_SEC.
 """
+import base64
 import hashlib
 import hmac
-import json
+import threading
 import time
+from collections import OrderedDict
+from functools import lru_cache
 from urllib.parse import unquote, parse_qsl
 from typing import Optional
 from fastapi import Request, HTTPException
+from .metrics import AUTH_HMAC_SECONDS, timed
+from .serializer import loads
+
+INIT_DATA_TTL_SEC = 3600
+INIT_DATA_CACHE_SIZE = 10_000
+SESSION_TOKEN_VERSION = "s1"
+
+
+# ─── Verification cache ───────────────────────────────────────────────────────
+class _VerifiedInitDataCache:
+    """Bounded LRU of verified initData, each entry expiring at auth_date + TTL."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes, now: float) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, parsed = entry
+            if now > expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return parsed
+
+    def put(self, key: bytes, expires_at: float, parsed: dict) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, parsed)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+_cache = _VerifiedInitDataCache(INIT_DATA_CACHE_SIZE)
+
+
+def init_data_cache_stats() -> dict:
+    return _cache.stats()
+
+
+def clear_init_data_cache() -> None:
+    _cache.clear()
+
+
+@lru_cache(maxsize=8)
+def _secret_key(bot_token: str) -> bytes:
+    """HMAC key derived from the bot token — computed once per token per process."""
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def _cache_key(init_data: str, bot_token: str) -> bytes:
+    return hashlib.blake2b(init_data.encode(), key=_secret_key(bot_token)[:32], digest_size=20).digest()
 
 
-def verify_telegram_init_data(init_data: str, bot_token: str) -> dict:
+# ─── Verification ─────────────────────────────────────────────────────────────
+def verify_telegram_init_data(init_data: str, bot_token: str, use_cache: bool = True) -> dict:
     """
     Verify Telegram WebApp initData and return the parsed user dict.
     Raises HTTPException(401) if invalid.
@@ -19,6 +98,22 @@ def verify_telegram_init_data(init_data: str, bot_token: str) -> dict:
     if not init_data:
         raise HTTPException(status_code=401, detail="Missing Telegram init data")
 
+    now = time.time()
+    key = None
+    if use_cache:
+        key = _cache_key(init_data, bot_token)
+        cached = _cache.get(key, now)
+        if cached is not None:
+            return cached
+
+    with timed(AUTH_HMAC_SECONDS, "init_data"):
+        parsed = _verify_uncached(init_data, bot_token, now)
+    if key is not None:
+        _cache.put(key, int(parsed["params"].get("auth_date", 0)) + INIT_DATA_TTL_SEC, parsed)
+    return parsed
+
+
+def _verify_uncached(init_data: str, bot_token: str, now: float) -> dict:
     try:
         params = dict(parse_qsl(unquote(init_data), keep_blank_values=True))
     except Exception:
@@ -32,22 +127,21 @@ def verify_telegram_init_data(init_data: str, bot_token: str) -> dict:
     data_check = "\n".join(f"{k}={v}" for k, v in sorted(params.items()))
 
     # HMAC-SHA256
-    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
-    expected_hash = hmac.new(secret_key, data_check.encode(), hashlib.sha256).hexdigest()
+    expected_hash = hmac.new(_secret_key(bot_token), data_check.encode(), hashlib.sha256).hexdigest()
 
     if not hmac.compare_digest(expected_hash, received_hash):
         raise HTTPException(status_code=401, detail="Invalid init data signature")
 
     # Check auth_date freshness (allow 1 hour)
     auth_date = int(params.get("auth_date", 0))
-    if time.time() - auth_date > 3600:
+    if now - auth_date > INIT_DATA_TTL_SEC:
         raise HTTPException(status_code=401, detail="Init data expired")
 
     # Parse user
     user_str = params.get("user", "{}")
     try:
-        user = json.loads(user_str)
-    except json.JSONDecodeError:
+        user = loads(user_str)
+    except ValueError:
         raise HTTPException(status_code=401, detail="Invalid user data")
 
     return {"user": user, "params": params}
@@ -57,6 +151,71 @@ def get_init_data_header(request: Request) -> str:
     return request.headers.get("X-Telegram-Init-Data", "")
 
 
+def get_session_token_header(request: Request) -> str:
+    auth = request.headers.get("Authorization", "")
+    if auth[:7].lower() == "bearer ":
+        return auth[7:].strip()
+    return ""
+
+
+# ─── Session tokens ───────────────────────────────────────────────────────────
+# Issued by /auth/telegram once initData has been verified. Format:
+#   s1.<user_id>.<telegram_id>.<expires_unix>.<base64url HMAC-SHA256>
+# Checking one costs a single HMAC — no JSON, no DB lookup by telegram_id.
+@lru_cache(maxsize=8)
+def _session_key(secret_key: str) -> bytes:
+    return hmac.new(secret_key.encode(), b"session-token", hashlib.sha256).digest()
+
+
+def _session_signature(body: str, secret_key: str) -> str:
+    digest = hmac.new(_session_key(secret_key), body.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def issue_session_token(user_id: int, telegram_id: int, secret_key: str, ttl_sec: int) -> tuple[str, int]:
+    """Return (token, expires_unix)."""
+    if not secret_key:
+        raise ValueError("Session tokens need a secret key")
+    expires_at = int(time.time()) + ttl_sec
+    body = f"{SESSION_TOKEN_VERSION}.{user_id}.{telegram_id}.{expires_at}"
+    return f"{body}.{_session_signature(body, secret_key)}", expires_at
+
+
+def verify_session_token(token: str, secret_key: str) -> Optional[dict]:
+    """Return {"user_id", "telegram_id"} for a valid, unexpired token, else None."""
+    if not secret_key:
+        return None
+    body, _, signature = token.rpartition(".")
+    parts = body.split(".")
+    if len(parts) != 4 or parts[0] != SESSION_TOKEN_VERSION:
+        return None
+    if not hmac.compare_digest(_session_signature(body, secret_key), signature):
+        return None
+    try:
+        user_id, telegram_id, expires_at = int(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+    if time.time() > expires_at:
+        return None
+    return {"user_id": user_id, "telegram_id": telegram_id}
+
+
+def resolve_identity(request: Request, bot_token: str, secret_key: str, allow_dev: bool = False) -> dict:
+    """
+    Identify the caller as {"user_id", "telegram_id"}.
+    A valid session token wins; otherwise fall back to initData (user_id is None).
+    An empty secret_key disables tokens.
+    """
+    token = get_session_token_header(request)
+    if token and secret_key:
+        with timed(AUTH_HMAC_SECONDS, "session_token"):
+            identity = verify_session_token(token, secret_key)
+        if identity is not None:
+            return identity
+    parsed = parse_user_from_init_data(get_init_data_header(request), bot_token, allow_dev=allow_dev)
+    return {"user_id": None, "telegram_id": parsed["user"]["id"]}
+
+
 def parse_user_from_init_data(init_data: str, bot_token: str, allow_dev: bool = False) -> dict:
     """
     In development mode (no token configured), return a mock user.
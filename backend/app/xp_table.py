@@ -0,0 +1,102 @@
+"""
+Player level curve.
+
+Levels are resolved from a cumulative table instead of walking the curve:
+CUMULATIVE_XP[L] is the XP it takes to get from level 1 to level L, so the
+level for a running XP total is a bisect. The table starts at
+INITIAL_LEVELS and grows on demand whenever a level or total runs past its
+end, so there is no level cap.
+"""
+import threading
+from bisect import bisect_right
+from typing import Sequence
+
+INITIAL_LEVELS = 128
+GROW_BY = 64
+
+# Index = level; [0] is a placeholder so that CUMULATIVE_XP[1] == 0
+CUMULATIVE_XP = [0, 0]
+_grow_lock = threading.Lock()
+
+
+def xp_for_level(level: int) -> int:
+    """XP needed to go from level - 1 to level."""
+    return int(100 * (1.4 ** (level - 1)))
+
+
+def _append() -> None:
+    level = len(CUMULATIVE_XP)
+    CUMULATIVE_XP.append(CUMULATIVE_XP[-1] + xp_for_level(level))
+
+
+def _grow(level: int = 0, total: int = -1) -> None:
+    """Extend the table to cover `level` and go past `total`, plus some slack."""
+    with _grow_lock:
+        while len(CUMULATIVE_XP) <= level or CUMULATIVE_XP[-1] <= total:
+            _append()
+        target = len(CUMULATIVE_XP) + GROW_BY
+        try:
+            while len(CUMULATIVE_XP) < target:
+                _append()
+        except OverflowError:
+            pass  # the float curve ends around level 2100; only the slack is lost
+
+
+# ─── Lookups ──────────────────────────────────────────────────────────────────
+def total_xp(level: int, experience: int) -> int:
+    """Lifetime XP of a player at `level` (>= 1) with `experience` into it."""
+    if level >= len(CUMULATIVE_XP):
+        _grow(level=level)
+    return CUMULATIVE_XP[level] + experience
+
+
+def level_for_total(total: int) -> tuple[int, int]:
+    """(level, experience into that level) for a lifetime XP total."""
+    if total >= CUMULATIVE_XP[-1]:
+        _grow(total=total)
+    level = bisect_right(CUMULATIVE_XP, total) - 1
+    return level, total - CUMULATIVE_XP[level]
+
+
+def resolve_level(level: int, experience: int) -> tuple[int, int]:
+    """
+    Apply pending level-ups: where a player at `level` with `experience`
+    banked ends up. Same result as subtracting xp_for_level(level + 1) while
+    it fits.
+    """
+    if level < 1 or experience < 0:
+        # Off the curve (corrupt state) — take the long way round
+        while experience >= xp_for_level(level + 1):
+            experience -= xp_for_level(level + 1)
+            level += 1
+        return level, experience
+    table = CUMULATIVE_XP
+    if level + 1 < len(table) and experience < table[level + 1] - table[level]:
+        return level, experience    # the usual case: no level-up, nothing to search
+    return level_for_total(total_xp(level, experience))
+
+
+def resolve_levels(players: Sequence[tuple[int, int]]) -> list[tuple[int, int]]:
+    """resolve_level for many (level, experience) pairs, e.g. leaderboards."""
+    if not players:
+        return []
+    top_level = max(level for level, _ in players)
+    if top_level >= len(CUMULATIVE_XP):
+        _grow(level=top_level)
+    totals = [CUMULATIVE_XP[level] + exp if level >= 1 and exp >= 0 else None for level, exp in players]
+    top_total = max((t for t in totals if t is not None), default=-1)
+    if top_total >= CUMULATIVE_XP[-1]:
+        _grow(total=top_total)
+
+    table = CUMULATIVE_XP
+    resolved = []
+    for (level, exp), total in zip(players, totals):
+        if total is None:
+            resolved.append(resolve_level(level, exp))
+        else:
+            new_level = bisect_right(table, total) - 1
+            resolved.append((new_level, total - table[new_level]))
+    return resolved
+
+
+_grow(level=INITIAL_LEVELS)
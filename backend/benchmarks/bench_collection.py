@@ -0,0 +1,60 @@
+"""
+discoveredCreatures as a list of dicts vs the Collection bitmask/arrays.
+
+Checks that list → compact → list round-trips, then compares stored blob
+size and the cost of a discovery and of the collection-screen queries
+("how many found", "highest level in a family").
+
+Run from backend/:
+    python -m benchmarks.bench_collection
+"""
+import random
+import statistics
+
+from app.collection import Collection, compact_state
+from app.game_data import CREATURE_INDEX, FAMILY_IDS
+from app.serializer import dumps
+from .fixtures import make_state, rate
+
+CORPUS = 2_000
+
+
+def old_discover(discovered: list, family: str, level: int, now_ms: int) -> list:
+    """perform_merge / perform_buy before the GameState index: scan, then copy."""
+    discovered = list(discovered)
+    existing = next((d for d in discovered if d["family"] == family and d["level"] == level), None)
+    if existing is None:
+        discovered.append({"family": family, "level": level, "discoveredAt": now_ms, "totalMerged": 1})
+    else:
+        existing["totalMerged"] += 1
+    return discovered
+
+
+def main():
+    rng = random.Random(20)
+    corpus = [make_state(rng, filled_slots=rng.randint(5, 40)) for _ in range(CORPUS)]
+
+    for s in corpus:
+        entries = sorted(s["discoveredCreatures"], key=lambda d: (d["discoveredAt"], CREATURE_INDEX[(d["family"], d["level"])]))
+        assert Collection.from_compact(Collection.from_list(entries).to_compact()).to_list() == entries
+    print(f"parity: {CORPUS} collections round-trip")
+
+    as_list = statistics.mean(len(dumps(s)) for s in corpus)
+    compact = statistics.mean(len(dumps(compact_state(s))) for s in corpus)
+    print(f"state JSON: list {as_list:,.0f} B   compact {compact:,.0f} B   ({1 - compact / as_list:.0%} smaller)")
+
+    entries = corpus[0]["discoveredCreatures"]
+    coll = Collection.from_list(entries)
+    keys = list(CREATURE_INDEX)
+    picks = [rng.choice(keys) for _ in range(1000)]
+    old = rate(lambda: [old_discover(entries, f, l, 1) for f, l in picks]) * len(picks)
+    new = rate(lambda: [coll.discover(f, l, 1, merged=1) for f, l in picks]) * len(picks)
+    print(f"discover: list scan {old:,.0f}/s   bitmask {new:,.0f}/s")
+
+    old = rate(lambda: [max((d["level"] for d in entries if d["family"] == f), default=0) for f in FAMILY_IDS])
+    new = rate(lambda: [coll.highest_level(f) for f in FAMILY_IDS])
+    print(f"highest level per family: list {old * len(FAMILY_IDS):,.0f}/s   bitmask {new * len(FAMILY_IDS):,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Pure-Python throughput of game actions (merge / collect / buy) on small and
+very large grids.
+
+Each session starts from a state dict, applies a burst of actions through
+game_service and dumps back to a dict — the same work a route does.
+
+Run from backend/:
+    python -m benchmarks.bench_game_actions
+"""
+import random
+import time
+
+from app import game_service
+from app.game_data import MAX_GRID_SIZE
+
+ACTIONS_PER_SESSION = 20
+
+
+def _grid_state(size: int, rng: random.Random) -> dict:
+    state = game_service.default_game_state()
+    now_ms = int(time.time() * 1000)
+    grid = [None] * size
+    # Fill ~90% with level-1 fairy cats so merges always find partners
+    for i in range(size):
+        if rng.random() < 0.9:
+            grid[i] = {
+                "id": i + 1,
+                "family": "fairy_cat", "level": 1,
+                "lastCollected": now_ms - 120_000,
+                "pendingResources": {"leaves": 0, "dew": 0, "berries": 0},
+                "isCollecting": False,
+            }
+    state["grid"] = grid
+    state["nextCreatureId"] = size + 1
+    state["unlockedSlots"] = size
+    state["resources"] = {"leaves": 10**9, "dew": 10**6, "berries": 0}
+    return state
+
+
+def _dump(state):
+    return state if isinstance(state, dict) else state.to_dict()
+
+
+def _session(state: dict, rng: random.Random) -> dict:
+    grid = state["grid"]
+    ids = [c["id"] for c in grid if c]
+    st = state
+    for k in range(ACTIONS_PER_SESSION):
+        op = k % 4
+        if op in (0, 1):
+            a, b = ids.pop(), ids.pop()
+            st, r = game_service.perform_merge(st, a, b)
+            ids.insert(0, r["newCreatureId"])
+        elif op == 2:
+            st, _ = game_service.perform_collect(st, ids[rng.randrange(len(ids))])
+        else:
+            try:
+                st, r = game_service.perform_buy(st, "buy_fairy_cat_1")
+                ids.insert(0, r["newCreatureId"])
+            except ValueError:
+                pass
+    return _dump(st)
+
+
+def main():
+    rng = random.Random(3)
+    print(f"{'grid':>6} {'sessions/s':>11} {'actions/s':>11}")
+    for size in (MAX_GRID_SIZE, 400, 4000):
+        base = _grid_state(size, rng)
+        sessions = 0
+        deadline = time.perf_counter() + 1.5
+        start = time.perf_counter()
+        while time.perf_counter() < deadline:
+            _session({**base, "grid": list(base["grid"])}, rng)
+            sessions += 1
+        rate = sessions / (time.perf_counter() - start)
+        print(f"{size:6d} {rate:11.0f} {rate * ACTIONS_PER_SESSION:11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+CPU per request for the hot routes under each JSON engine (stdlib json vs orjson).
+
+Each engine runs in its own process (the engine is chosen at import time)
+against a throwaway SQLite database holding a full 40-slot state.
+
+Run from backend/:
+    python -m benchmarks.bench_json_engine
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+REQUESTS = 300
+
+
+def _child(engine: str):
+    os.environ.update({
+        "JSON_ENGINE": engine,
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/bench.db",
+        "TELEGRAM_BOT_TOKEN": "",
+        "ENVIRONMENT": "development",
+        "DEBUG": "false",
+        "SAVE_COALESCING": "false",
+    })
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database import SessionLocal
+    from app.models import User
+    from app.state_codec import encode_state
+    from .fixtures import make_state
+
+    rng = random.Random(1)
+    full = make_state(rng, filled_slots=38)
+    pair = {"family": "fairy_cat", "level": 1, "lastCollected": 0,
+            "pendingResources": {"leaves": 0, "dew": 0, "berries": 0}, "isCollecting": False}
+    full["grid"][38] = {"id": "c_bench_a", **pair}
+    full["grid"][39] = {"id": "c_bench_b", **pair}
+    full["unlockedSlots"] = 40
+    blob = encode_state(full)
+
+    def reset():
+        with SessionLocal() as db:
+            db.query(User).update({User.game_state: blob})
+            db.commit()
+
+    timings = {}
+
+    def timed(name, call):
+        start = time.process_time()
+        resp = call()
+        timings.setdefault(name, []).append(time.process_time() - start)
+        assert resp.status_code == 200, resp.text
+
+    with TestClient(app) as client:
+        token = client.post("/api/auth/telegram", json={}).json()["sessionToken"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for _ in range(REQUESTS):
+            reset()
+            timed("/auth/telegram", lambda: client.post("/api/auth/telegram", json={}))
+            reset()
+            timed("/game/state", lambda: client.get("/api/game/state", headers=headers))
+            reset()
+            timed("/game/merge", lambda: client.post(
+                "/api/game/merge", json={"from_id": "c_bench_a", "to_id": "c_bench_b"}, headers=headers))
+
+    for name, ts in timings.items():
+        ts.sort()
+        print(f"{name}\t{ts[len(ts) // 2] * 1e6:.0f}")
+
+
+def main():
+    results = {}
+    for engine in ("json", "orjson"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_json_engine", "--child", engine],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        for line in out.splitlines():
+            if "\t" in line:
+                route, us = line.split("\t")
+                results.setdefault(route, {})[engine] = float(us)
+
+    print(f"{'route':<16} {'json µs':>9} {'orjson µs':>10} {'saved':>8}")
+    for route, r in results.items():
+        print(f"{route:<16} {r['json']:9.0f} {r['orjson']:10.0f} {r['json'] - r['orjson']:7.0f}µs")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        _child(sys.argv[2])
+    else:
+        main()
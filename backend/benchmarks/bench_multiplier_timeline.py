@@ -0,0 +1,95 @@
+"""
+Production under a changing multiplier: per-segment tick counts from the
+MultiplierTimeline vs looking up the multiplier for every tick.
+
+Checks tick_weights() and integrate() against brute force on random
+timelines (boosters, subscription windows, events), and perform_collect
+with queued boosters against a per-tick reference, then times a long
+absence under many boosts.
+
+Run from backend/:
+    python -m benchmarks.bench_multiplier_timeline
+"""
+import random
+import time
+from collections import Counter
+
+from app import game_service
+from app.game_data import CREATURE_INDEX, INTERVAL_SEC, PRODUCTION
+from app.game_state import GameState
+from app.multiplier_timeline import MultiplierTimeline
+from .fixtures import rate
+
+HOUR_MS = 3600 * 1000
+CASES = 3_000
+
+
+def _random_sources(rng: random.Random, origin: int, count: int) -> list[tuple]:
+    sources = []
+    for _ in range(count):
+        start = origin + rng.randint(-2, 10) * HOUR_MS + rng.randint(0, 59) * 60_000
+        sources.append((start, start + rng.randint(1, 180) * 60_000, rng.choice([1.2, 1.5, 2.0, 2.0, 3.0])))
+    return sources
+
+
+def brute_weights(timeline: MultiplierTimeline, start_ms: int, interval_ms: int, ticks: int) -> Counter:
+    return Counter(timeline.at(start_ms + i * interval_ms) for i in range(1, ticks + 1))
+
+
+def verify(rng: random.Random) -> None:
+    origin = 28_333_333 * 60_000   # a whole minute
+    for _ in range(CASES):
+        timeline = MultiplierTimeline.build(_random_sources(rng, origin, rng.randint(0, 12)), rng.choice([1.0, 1.5]))
+        start = origin + rng.randint(0, 4 * 3600) * 1000
+        interval = rng.choice(INTERVAL_SEC) * 1000
+        ticks = rng.randint(0, 1500)
+        got = Counter()
+        for count, mult in timeline.tick_weights(start, interval, ticks):
+            got[mult] += count
+        assert got == brute_weights(timeline, start, interval, ticks)
+
+        # Breakpoints are whole minutes, so a per-minute Riemann sum is exact
+        minute = start // 60_000 * 60_000
+        span = rng.randint(0, 12 * 60)
+        riemann = sum(timeline.at(minute + m * 60_000) for m in range(span)) * 60_000
+        assert abs(timeline.integrate(minute, minute + span * 60_000) - riemann) < 1e-6 * max(riemann, 1)
+    print(f"timeline: {CASES} random timelines, tick_weights and integrate match brute force")
+
+    mismatches = 0
+    for _ in range(500):
+        state = GameState.from_dict(game_service.default_game_state())
+        state.resources["dew"] = 10**6
+        now = int(time.time() * 1000)
+        for c in state.grid:
+            if c:
+                c["lastCollected"] = now - rng.randint(0, 10 * HOUR_MS)
+        for _ in range(rng.randint(0, 8)):
+            game_service._add_booster(state, "boost_2x_60", game_service.SHOP_ITEMS["boost_2x_60"], now - rng.randint(0, 9 * HOUR_MS))
+        timeline = game_service.production_timeline(state)
+        for c in [c for c in state.grid if c]:
+            k = CREATURE_INDEX[(c["family"], c["level"])]
+            ticks = int((now - c["lastCollected"]) / 1000 / INTERVAL_SEC[k])
+            weights = brute_weights(timeline, c["lastCollected"], INTERVAL_SEC[k] * 1000, ticks).items()
+            expected = [int(sum(p * n * m for m, n in sorted(weights, key=lambda w: -w[0]))) for p in PRODUCTION[k]]
+            got = game_service._collect_amounts(k, c, now, timeline, []) or [0, 0, 0]
+            mismatches += got != expected
+    print(f"collect: 500 grids with queued boosters, {mismatches} mismatches vs per-tick reference")
+    assert mismatches == 0
+
+
+def main():
+    rng = random.Random(22)
+    verify(rng)
+
+    # One creature idle for 8 h at a 25 s tick (1152 ticks) under n boosts
+    start, interval, ticks = 1_700_000_000_000, 25_000, 8 * 3600 // 25
+    print(f"{'boosts':>7} {'per tick/s':>11} {'segments/s':>11}")
+    for n in (0, 8, 64):
+        timeline = MultiplierTimeline.build(_random_sources(rng, start, n))
+        per_tick = rate(lambda: brute_weights(timeline, start, interval, ticks))
+        segments = rate(lambda: timeline.tick_weights(start, interval, ticks))
+        print(f"{n:7d} {per_tick:11,.0f} {segments:11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Offline production: scalar calculate_offline_bonus vs the vectorized engine,
+for one user and for whole-population batches.
+
+Checks parity first (random grids, subscriptions, unknown creatures and
+offline times around the 30 s floor and the MAX_OFFLINE_HOURS cap), then
+times both.
+
+Run from backend/:
+    python -m benchmarks.bench_offline_engine
+"""
+import random
+
+from app.game_data import FAMILY_IDS, MAX_GRID_SIZE, MAX_LEVEL, MAX_OFFLINE_HOURS, SUBSCRIPTION_BENEFITS
+from app.game_service import calculate_offline_bonus
+from app.offline_engine import offline_bonus, offline_bonus_batch, offline_production, pack_states
+from .fixtures import rate
+
+NOW_MS = 1_700_000_000_000
+PARITY_USERS = 5000
+
+
+def _random_state(rng: random.Random) -> dict:
+    grid = [None] * MAX_GRID_SIZE
+    for i in range(MAX_GRID_SIZE):
+        if rng.random() < 0.7:
+            family = rng.choice(FAMILY_IDS) if rng.random() < 0.98 else "retired_family"
+            grid[i] = {"id": f"c{i}", "family": family, "level": rng.randint(1, MAX_LEVEL + (rng.random() < 0.02))}
+    offline_ms = rng.choice([
+        rng.randint(0, 60_000),
+        rng.randint(0, MAX_OFFLINE_HOURS * 3600 * 1000),
+        rng.randint(MAX_OFFLINE_HOURS * 3600 * 1000, 3 * 24 * 3600 * 1000),
+    ])
+    return {
+        "grid": grid,
+        "lastOnline": 0 if rng.random() < 0.01 else NOW_MS - offline_ms,
+        "subscription": rng.choice(["none", *SUBSCRIPTION_BENEFITS]),
+    }
+
+
+def check_parity(states: list[dict]) -> None:
+    expected = [calculate_offline_bonus(s, NOW_MS) for s in states]
+    batch = offline_bonus_batch(states, NOW_MS)
+    mismatches = sum(a != b for a, b in zip(expected, batch))
+    mismatches += sum(offline_bonus(s, NOW_MS) != e for s, e in zip(states[:200], expected))
+    print(f"parity: {len(states)} users, {mismatches} mismatches")
+    assert mismatches == 0
+
+
+def main():
+    rng = random.Random(11)
+    states = [_random_state(rng) for _ in range(PARITY_USERS)]
+    check_parity(states)
+
+    # "packed" is the engine alone on arrays built once, as a nightly job
+    # that keeps the population in columnar form would run it
+    print(f"{'users':>7} {'scalar users/s':>15} {'numpy users/s':>14} {'packed users/s':>15}")
+    for n in (1, 100, 10_000, 100_000):
+        batch = states[:n] if n <= len(states) else [_random_state(rng) for _ in range(n)]
+        arrays = pack_states(batch, NOW_MS)
+        scalar = rate(lambda: [calculate_offline_bonus(s, NOW_MS) for s in batch]) * n
+        vector = rate(lambda: offline_bonus_batch(batch, NOW_MS)) * n
+        packed = rate(lambda: offline_production(*arrays, NOW_MS)) * n
+        print(f"{n:7d} {scalar:15.0f} {vector:14.0f} {packed:15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Offline income from the per-interval-class production aggregate vs walking
+the grid.
+
+Verifier first: random merge / buy / referral / collect sequences, checking
+after every action that GameState's maintained rates equal a full recompute
+from the grid, and that calculate_offline_bonus matches the old per-slot
+walk over random offline spans. Then times both ways on loaded states.
+
+Run from backend/:
+    python -m benchmarks.bench_production_rates
+"""
+import random
+
+from app import game_service
+from app.game_data import CREATURE_INDEX, INTERVAL_CLASS, INTERVAL_CLASSES, INTERVAL_SEC, MAX_OFFLINE_HOURS, PRODUCTION, SHOP_ITEMS, get_subscription_multiplier
+from app.game_state import GameState
+from .fixtures import make_state, rate
+
+USERS = 300
+ACTIONS_PER_USER = 200
+# Boosters change the multiplier over time, which the reference walk doesn't
+# model; bench_multiplier_timeline covers them
+SHOP_NO_BOOSTERS = [item_id for item_id, item in SHOP_ITEMS.items() if item["category"] != "booster"]
+
+
+def recompute_rates(grid: list) -> list[list[int]]:
+    rates = [[0, 0, 0] for _ in INTERVAL_CLASSES]
+    for c in grid:
+        k = c and CREATURE_INDEX.get((c["family"], c["level"]))
+        if k is None:
+            continue
+        for r, amount in enumerate(PRODUCTION[k]):
+            rates[INTERVAL_CLASS[k]][r] += amount
+    return rates
+
+
+def walk_offline_bonus(state: GameState, current_time_ms: int) -> dict:
+    """calculate_offline_bonus before the aggregate: every slot, every time."""
+    last_online = state.last_online or current_time_ms
+    offline_ms = min(current_time_ms - last_online, MAX_OFFLINE_HOURS * 3600 * 1000)
+    if offline_ms < 30_000:
+        return {"leaves": 0, "dew": 0, "berries": 0}
+    offline_sec = offline_ms / 1000
+    mult = get_subscription_multiplier(state.subscription)
+    leaves = dew = berries = 0
+    for creature in state.grid:
+        if not creature:
+            continue
+        k = CREATURE_INDEX.get((creature["family"], creature["level"]))
+        if k is None:
+            continue
+        ticks = int(offline_sec / INTERVAL_SEC[k])
+        p_leaves, p_dew, p_berries = PRODUCTION[k]
+        leaves += p_leaves * ticks
+        dew += p_dew * ticks
+        berries += p_berries * ticks
+    return {"leaves": int(leaves * mult), "dew": int(dew * mult), "berries": int(berries * mult)}
+
+
+def _random_action(state: GameState, rng: random.Random) -> None:
+    ids = [c["id"] for c in state.grid if c]
+    op = rng.random()
+    try:
+        if op < 0.5 and len(ids) >= 2:
+            game_service.perform_merge(state, *rng.sample(ids, 2))
+        elif op < 0.75:
+            game_service.perform_buy(state, rng.choice(SHOP_NO_BOOSTERS))
+        elif op < 0.85:
+            game_service.apply_referrer_reward(state)
+        elif ids:
+            game_service.perform_collect(state, rng.choice(ids))
+    except ValueError:
+        pass
+
+
+def verify(rng: random.Random) -> None:
+    checks = 0
+    for _ in range(USERS):
+        data = make_state(rng, filled_slots=rng.randint(0, 40))
+        data["subscription"] = rng.choice(["none", "sprout", "grove", "enchanted"])
+        data["resources"] = {"leaves": 10**7, "dew": 10**6, "berries": 10**4}
+        state = GameState.from_dict(data)
+        for _ in range(ACTIONS_PER_USER):
+            _random_action(state, rng)
+            assert state.production_rates() == recompute_rates(state.grid)
+            now_ms = state.last_online + rng.randint(0, 2 * MAX_OFFLINE_HOURS * 3600 * 1000)
+            assert game_service.calculate_offline_bonus(state, now_ms) == walk_offline_bonus(state, now_ms)
+            checks += 1
+    print(f"verified: {checks:,} actions, aggregate == recompute and offline bonus == grid walk")
+
+
+def main():
+    rng = random.Random(21)
+    verify(rng)
+
+    print(f"{'filled':>7} {'grid walk/s':>12} {'aggregate/s':>12}")
+    for filled in (5, 20, 40):
+        state = GameState.from_dict(make_state(rng, filled_slots=filled))
+        now_ms = state.last_online + 6 * 3600 * 1000
+        walk = rate(lambda: walk_offline_bonus(state, now_ms))
+        agg = rate(lambda: game_service.calculate_offline_bonus(state, now_ms))
+        print(f"{filled:7d} {walk:12,.0f} {agg:12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Quest progress per event: the old walk-and-copy-every-quest update vs the
+event-indexed engine, with many concurrent quests per user.
+
+Each round loads a fresh GameState (so the index, for lists long enough to
+get one, is built once per request, as in a route) and fires a burst of
+merge and collect events at it. Final
+quest lists are compared against the old implementation first.
+
+Run from backend/:
+    python -m benchmarks.bench_quest_engine
+"""
+import random
+
+from app.game_data import FAMILY_IDS, RESOURCES
+from app.game_state import GameState
+from app.quest_engine import INDEX_MIN_QUESTS
+from .fixtures import rate
+
+EVENTS_PER_REQUEST = 20
+
+
+def old_update_quest_progress(quests: list, event_type: str, amount: int, family: str = "", resources: dict = None) -> list:
+    """game_service._update_quest_progress before the engine."""
+    resources = resources or {}
+    updated = []
+    for q in quests:
+        if q.get("completed") or q.get("claimedAt"):
+            updated.append(q)
+            continue
+
+        q = dict(q)
+        if q["type"] == "merge" and event_type == "merge":
+            q["currentAmount"] = min(q["currentAmount"] + amount, q["targetAmount"])
+        elif q["type"] == "collect" and event_type == "collect":
+            res_key = q.get("targetResource", "leaves")
+            earned = resources.get(res_key, 0)
+            q["currentAmount"] = min(q["currentAmount"] + earned, q["targetAmount"])
+        elif q["type"] == "collect_type" and event_type == "collect" and q.get("targetFamily") == family:
+            res_key = q.get("targetResource", "leaves")
+            earned = resources.get(res_key, 0)
+            q["currentAmount"] = min(q["currentAmount"] + earned, q["targetAmount"])
+
+        q["completed"] = q["currentAmount"] >= q["targetAmount"]
+        updated.append(q)
+    return updated
+
+
+def _quests(rng: random.Random, count: int) -> list[dict]:
+    quests = []
+    for i in range(count):
+        kind = rng.choice(["merge", "collect", "collect_type", "collect_type"])
+        q = {
+            "id": f"q_{i}", "type": kind, "targetAmount": rng.randint(50, 5000), "currentAmount": 0,
+            "rewardLeaves": 10, "rewardDew": 1, "rewardBerries": 0, "completed": False, "claimedAt": None,
+        }
+        if kind != "merge":
+            q["targetResource"] = rng.choice(RESOURCES)
+        if kind == "collect_type":
+            q["targetFamily"] = rng.choice(FAMILY_IDS)
+        quests.append(q)
+    return quests
+
+
+def _events(rng: random.Random, count: int) -> list[tuple]:
+    events = []
+    for _ in range(count):
+        family = rng.choice(FAMILY_IDS)
+        if rng.random() < 0.4:
+            events.append(("merge", 1, family, None))
+        else:
+            earned = {r: rng.randint(0, 40) for r in RESOURCES}
+            events.append(("collect", earned["leaves"] + earned["dew"], family, earned))
+    return events
+
+
+def run_old(quests, events):
+    state = GameState.from_dict({"dailyQuests": quests})
+    for event_type, amount, family, earned in events:
+        state.daily_quests = old_update_quest_progress(
+            state.daily_quests, event_type, amount, family if event_type == "collect" else "", earned,
+        )
+    return state.daily_quests
+
+
+def run_new(quests, events):
+    state = GameState.from_dict({"dailyQuests": quests})
+    for event in events:
+        state.quest_event(*event)
+    return state.daily_quests
+
+
+def main():
+    rng = random.Random(17)
+    for _ in range(200):
+        quests, events = _quests(rng, rng.randint(1, 80)), _events(rng, 200)
+        assert run_old(quests, events) == run_new(quests, events)
+    print("parity: 200 users x 200 events, identical quest lists")
+
+    print(f"{'quests':>7} {'old events/s':>13} {'engine events/s':>16}   (index from {INDEX_MIN_QUESTS} quests)")
+    for count in (4, 8, 16, 32, 50, 200):
+        quests, events = _quests(rng, count), _events(rng, EVENTS_PER_REQUEST)
+        old = rate(lambda: run_old(quests, events)) * EVENTS_PER_REQUEST
+        new = rate(lambda: run_new(quests, events)) * EVENTS_PER_REQUEST
+        print(f"{count:7d} {old:13,.0f} {new:16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+DB cost of /game/save: one commit per post vs. the write-behind coalescer.
+
+Simulates active players posting their full state several times per flush
+interval and compares rows written and wall time.
+
+Run from backend/:
+    python -m benchmarks.bench_save_coalescing
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import update
+
+from app.config import Settings
+from app.database import Base, make_engine
+from app.game_service import default_game_state
+from app.models import User
+from app.save_buffer import SaveCoalescer
+from app.state_codec import encode_state
+
+USERS = 200
+SAVES_PER_USER = 30
+SAVES_PER_FLUSH = 6      # ~3s client debounce vs. a 2s flush interval, for bursty players
+
+
+async def _engine():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = make_engine(Settings(database_url=f"sqlite:///{path}", environment="production", debug=False), use_async=True)
+    blob = json.dumps(default_game_state())
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(User.__table__.insert(), [
+            {"telegram_id": tg, "first_name": "P", "game_state": blob, "created_at": 0, "last_seen": 0}
+            for tg in range(USERS)
+        ])
+    return engine, blob
+
+
+async def direct(states) -> tuple[float, int]:
+    engine, _ = await _engine()
+    table = User.__table__
+    start = time.perf_counter()
+    for rnd in range(SAVES_PER_USER):
+        for tg in range(USERS):
+            async with engine.begin() as conn:
+                await conn.execute(update(table).where(table.c.telegram_id == tg).values(game_state=json.dumps(states[rnd])))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return elapsed, SAVES_PER_USER * USERS
+
+
+async def coalesced(states) -> tuple[float, int]:
+    engine, blob = await _engine()
+    buffer = SaveCoalescer(batch_size=10_000)
+    start = time.perf_counter()
+    for rnd in range(SAVES_PER_USER):
+        for tg in range(USERS):
+            buffer.enqueue(tg, blob, states[rnd], rnd + 1)   # the route passes the row's current blob
+        if (rnd + 1) % SAVES_PER_FLUSH == 0:
+            await buffer.flush(engine)
+            blob = encode_state(states[rnd])
+    await buffer.flush(engine)
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    assert buffer.stats["conflicts"] == 0, buffer.stats
+    return elapsed, buffer.stats["flushed"]
+
+
+async def main():
+    states = []
+    for i in range(SAVES_PER_USER):
+        s = default_game_state()
+        s["resources"]["leaves"] = i
+        states.append(s)
+
+    t_direct, w_direct = await direct(states)
+    t_coal, w_coal = await coalesced(states)
+    print(f"direct:    {w_direct:6d} row writes  {t_direct:6.2f}s")
+    print(f"coalesced: {w_coal:6d} row writes  {t_coal:6.2f}s  ({w_direct / w_coal:.1f}x fewer writes, {t_direct / t_coal:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
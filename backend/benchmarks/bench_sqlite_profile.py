@@ -0,0 +1,96 @@
+"""
+Concurrent read/write throughput on SQLite with the default vs. production profile.
+
+Writer threads rewrite a user's game_state while reader threads load it, the
+same mix as players tapping /game/collect and polling /game/state.
+
+Run from backend/:
+    python -m benchmarks.bench_sqlite_profile
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.config import Settings
+from app.database import make_engine
+from app.game_service import default_game_state
+
+USERS = 200
+WRITERS = 4
+READERS = 8
+DURATION_SEC = 3.0
+
+
+def _setup(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, game_state TEXT NOT NULL)"))
+        blob = json.dumps(default_game_state())
+        conn.execute(text("INSERT INTO users (id, game_state) VALUES (:id, :s)"), [{"id": i, "s": blob} for i in range(USERS)])
+
+
+def _run(profile: str) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    settings = Settings(database_url=f"sqlite:///{path}", environment="production", debug=False,
+                        db_pool_size=WRITERS + READERS)
+    engine = make_engine(settings, profile=profile)
+    _setup(engine)
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + DURATION_SEC
+
+    def writer(seed):
+        n = locked = 0
+        i = seed
+        while time.perf_counter() < stop:
+            i = (i + 7) % USERS
+            try:
+                with engine.begin() as conn:
+                    blob = conn.execute(text("SELECT game_state FROM users WHERE id = :id"), {"id": i}).scalar()
+                    conn.execute(text("UPDATE users SET game_state = :s WHERE id = :id"), {"s": blob, "id": i})
+                n += 1
+            except OperationalError:
+                locked += 1
+        with lock:
+            counts["writes"] += n
+            counts["locked"] += locked
+
+    def reader(seed):
+        n = locked = 0
+        i = seed
+        while time.perf_counter() < stop:
+            i = (i + 13) % USERS
+            try:
+                with engine.connect() as conn:
+                    json.loads(conn.execute(text("SELECT game_state FROM users WHERE id = :id"), {"id": i}).scalar())
+                n += 1
+            except OperationalError:
+                locked += 1
+        with lock:
+            counts["reads"] += n
+            counts["locked"] += locked
+
+    threads = [threading.Thread(target=writer, args=(k,)) for k in range(WRITERS)]
+    threads += [threading.Thread(target=reader, args=(k,)) for k in range(READERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return counts
+
+
+def main():
+    for profile in ("default", "production"):
+        c = _run(profile)
+        print(f"{profile:<10}  writes/s {c['writes'] / DURATION_SEC:8.0f}   reads/s {c['reads'] / DURATION_SEC:8.0f}"
+              f"   'database is locked' errors {c['locked']}")
+
+
+if __name__ == "__main__":
+    main()
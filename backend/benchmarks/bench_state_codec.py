@@ -0,0 +1,62 @@
+"""
+On-disk size and encode/decode cost of game_state blobs per storage codec.
+
+Run from backend/:
+    python -m benchmarks.bench_state_codec
+"""
+import json
+import random
+import statistics
+import time
+
+from app import state_codec
+from app.state_codec import encode_state, decode_state, train_zstd_dictionary
+from .fixtures import make_state
+
+CORPUS = 2_000
+
+
+def _measure(name, encode, decode, corpus):
+    blobs = []
+    start = time.perf_counter()
+    for s in corpus:
+        blobs.append(encode(s))
+    enc = (time.perf_counter() - start) / len(corpus)
+    start = time.perf_counter()
+    for b in blobs:
+        decode(b)
+    dec = (time.perf_counter() - start) / len(corpus)
+    sizes = [len(b) for b in blobs]
+    return name, statistics.mean(sizes), enc, dec
+
+
+def main():
+    rng = random.Random(7)
+    corpus = [make_state(rng, filled_slots=rng.randint(5, 40)) for _ in range(CORPUS)]
+    rows = [
+        _measure("json (legacy)", lambda s: json.dumps(s), decode_state, corpus),
+        _measure("zlib", lambda s: encode_state(s, "zlib"), decode_state, corpus),
+    ]
+    if state_codec.zstandard is not None:
+        rows.append(_measure("zstd", lambda s: encode_state(s, "zstd"), decode_state, corpus))
+        zstd = state_codec.zstandard
+        dict_data = zstd.ZstdCompressionDict(train_zstd_dictionary(corpus[:500]))
+        cctx = zstd.ZstdCompressor(level=state_codec.ZSTD_LEVEL, dict_data=dict_data)
+        dctx = zstd.ZstdDecompressor(dict_data=dict_data)
+        rows.append(_measure(
+            "zstd + dict",
+            lambda s: bytes((state_codec.FORMAT_ZSTD_DICT,)) + cctx.compress(json.dumps(s).encode()),
+            lambda b: json.loads(dctx.decompress(b[1:])),
+            corpus[500:],
+        ))
+    else:
+        print("(zstandard not installed — skipping zstd rows)")
+
+    base = rows[0][1]
+    print(f"{'codec':<14} {'avg bytes':>10} {'ratio':>7} {'encode µs':>10} {'decode µs':>10}")
+    for name, size, enc, dec in rows:
+        print(f"{name:<14} {size:10.0f} {base / size:6.1f}x {enc * 1e6:10.1f} {dec * 1e6:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
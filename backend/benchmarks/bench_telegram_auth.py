@@ -0,0 +1,38 @@
+"""
+Per-request auth cost: initData verification (with and without the verification
+cache) versus a session token issued by /auth/telegram.
+
+Run from backend/:
+    python -m benchmarks.bench_telegram_auth
+"""
+import timeit
+
+from app.telegram_auth import (
+    verify_telegram_init_data, clear_init_data_cache, init_data_cache_stats,
+    issue_session_token, verify_session_token,
+)
+from .fixtures import BENCH_BOT_TOKEN, make_init_data
+
+N = 20_000
+
+
+def main():
+    init_data = make_init_data(424242)
+
+    uncached = timeit.timeit(lambda: verify_telegram_init_data(init_data, BENCH_BOT_TOKEN, use_cache=False), number=N)
+
+    clear_init_data_cache()
+    cached = timeit.timeit(lambda: verify_telegram_init_data(init_data, BENCH_BOT_TOKEN), number=N)
+
+    secret = "bench-secret-key-at-least-32-characters"
+    token, _ = issue_session_token(1, 424242, secret, 3600)
+    session = timeit.timeit(lambda: verify_session_token(token, secret), number=N)
+
+    print(f"uncached: {uncached / N * 1e6:8.2f} µs/request")
+    print(f"cached:   {cached / N * 1e6:8.2f} µs/request  ({uncached / cached:.1f}x faster)")
+    print(f"session:  {session / N * 1e6:8.2f} µs/request  ({uncached / session:.1f}x faster)")
+    print(f"cache:    {init_data_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
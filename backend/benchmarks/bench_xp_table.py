@@ -0,0 +1,81 @@
+"""
+Level resolution: the old per-merge while loop vs the cumulative XP table.
+
+First checks parity with the loop over the whole range the float curve is
+defined on (every level, at and around each threshold, plus random
+multi-level jumps and off-curve states), then times single resolves and a
+leaderboard-sized batch.
+
+Run from backend/:
+    python -m benchmarks.bench_xp_table
+"""
+import random
+import time
+
+from app.xp_table import CUMULATIVE_XP, resolve_level, resolve_levels, total_xp, xp_for_level
+from .fixtures import rate
+
+RANDOM_CASES = 200_000
+BATCH_PLAYERS = 100_000
+
+
+def loop_resolve(level: int, exp: int) -> tuple[int, int]:
+    """What perform_merge did before the table."""
+    while exp >= xp_for_level(level + 1):
+        exp -= xp_for_level(level + 1)
+        level += 1
+    return level, exp
+
+
+def _curve_end() -> int:
+    level = 1
+    try:
+        while True:
+            xp_for_level(level + 1)
+            level += 1
+    except OverflowError:
+        return level - 1
+
+
+def check_parity(rng: random.Random) -> None:
+    last = _curve_end()
+    cases = []
+    for level in range(1, last - 1):
+        step = xp_for_level(level + 1)
+        cases += [(level, 0), (level, step - 1), (level, step), (level, step + xp_for_level(level + 2))]
+    for _ in range(RANDOM_CASES):
+        level = rng.randint(1, last - 60)
+        span = total_xp(level + rng.randint(1, 50), 0) - total_xp(level, 0)   # up to 50 level-ups
+        cases.append((level, rng.randint(0, span)))
+    cases += [(0, 500), (-3, 1000), (5, -20)]
+
+    mismatches = sum(resolve_level(l, e) != loop_resolve(l, e) for l, e in cases)
+    batch = resolve_levels(cases)
+    mismatches += sum(b != loop_resolve(l, e) for (l, e), b in zip(cases, batch))
+    print(f"parity: {len(cases)} cases up to level {last}, {mismatches} mismatches (table size {len(CUMULATIVE_XP)})")
+    assert mismatches == 0
+
+
+def main():
+    rng = random.Random(16)
+    check_parity(rng)
+
+    # Typical merge: mid-game player gaining a merge's worth of XP
+    merges = [(rng.randint(5, 40), rng.randint(0, 5000)) for _ in range(1000)]
+    loop = rate(lambda: [loop_resolve(l, e) for l, e in merges]) * len(merges)
+    table = rate(lambda: [resolve_level(l, e) for l, e in merges]) * len(merges)
+    print(f"single resolve: loop {loop:,.0f}/s   table {table:,.0f}/s")
+
+    # Leaderboard: lifetime XP spread over the first few hundred levels
+    players = [(1, rng.randint(0, CUMULATIVE_XP[60])) for _ in range(BATCH_PLAYERS)]
+    start = time.perf_counter()
+    [loop_resolve(l, e) for l, e in players]
+    t_loop = time.perf_counter() - start
+    start = time.perf_counter()
+    resolve_levels(players)
+    t_batch = time.perf_counter() - start
+    print(f"batch of {BATCH_PLAYERS:,}: loop {t_loop:.2f}s   resolve_levels {t_batch:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Shared fixtures for the benchmarks — signed Telegram initData and synthetic users.
+"""
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode
+
+BENCH_BOT_TOKEN = "123456:bench-token-not-a-real-bot"
+
+
+def make_init_data(telegram_id: int, bot_token: str = BENCH_BOT_TOKEN, auth_date: int = None) -> str:
+    """Mint initData signed exactly the way Telegram does it."""
+    user = {
+        "id": telegram_id,
+        "first_name": f"Player{telegram_id}",
+        "username": f"player{telegram_id}",
+        "language_code": "en",
+    }
+    params = {
+        "auth_date": str(auth_date if auth_date is not None else int(time.time())),
+        "query_id": f"AAH{telegram_id}",
+        "user": json.dumps(user, separators=(",", ":")),
+    }
+    data_check = "\n".join(f"{k}={v}" for k, v in sorted(params.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    params["hash"] = hmac.new(secret_key, data_check.encode(), hashlib.sha256).hexdigest()
+    return urlencode(params)
+
+
+def make_state(rng, filled_slots: int = 25, buildings: int = 2, quests: int = 4) -> dict:
+    """A plausible mid-game state: a partly filled grid, quests, discoveries, buildings."""
+    from app.game_data import BUILDING_BONUSES, CREATURE_FAMILIES, MAX_GRID_SIZE, MAX_LEVEL
+    from app.game_service import default_game_state, generate_daily_quests
+
+    now_ms = int(time.time() * 1000)
+    families = list(CREATURE_FAMILIES)
+    state = default_game_state()
+    grid = [None] * MAX_GRID_SIZE
+    unlocked = max(state["unlockedSlots"], filled_slots)
+    for n, slot in enumerate(rng.sample(range(unlocked), min(filled_slots, unlocked)), start=1):
+        grid[slot] = {
+            "id": n,
+            "family": rng.choice(families),
+            "level": rng.randint(1, MAX_LEVEL),
+            "lastCollected": now_ms - rng.randint(0, 600_000),
+            "pendingResources": {"leaves": rng.randint(0, 50), "dew": rng.randint(0, 10), "berries": 0},
+            "isCollecting": False,
+        }
+    state["grid"] = grid
+    state["nextCreatureId"] = min(filled_slots, unlocked) + 1
+    state["unlockedSlots"] = unlocked
+    state["resources"] = {"leaves": rng.randint(0, 50_000), "dew": rng.randint(0, 5_000), "berries": rng.randint(0, 100)}
+    state["level"] = rng.randint(1, 30)
+    state["experience"] = rng.randint(0, 1_000)
+    state["totalMerges"] = rng.randint(0, 2_000)
+    state["discoveredCreatures"] = [
+        {"family": f, "level": lvl, "discoveredAt": now_ms - rng.randint(0, 10**9), "totalMerged": rng.randint(0, 300)}
+        for f in families for lvl in range(1, MAX_LEVEL + 1) if rng.random() < 0.6
+    ]
+    building_ids = list(BUILDING_BONUSES)
+    state["buildings"] = [{"defId": building_ids[i % len(building_ids)], "level": 1} for i in range(buildings)]
+    daily = []
+    while len(daily) < quests:
+        daily.extend(generate_daily_quests(rng=rng))
+    for q in daily[:quests]:
+        q["currentAmount"] = rng.randint(0, q["targetAmount"])
+        q["completed"] = q["currentAmount"] >= q["targetAmount"]
+    state["dailyQuests"] = daily[:quests]
+    state["questLastReset"] = now_ms
+    state["referralCode"] = "".join(rng.choices("ABCDEFGHJKLMNPQRSTUVWXYZ23456789", k=8))
+    return state
+
+
+def rate(fn, min_sec: float = 1.0) -> float:
+    """Calls per second of fn(), timed for at least min_sec."""
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_sec:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
@@ -0,0 +1,273 @@
+"""
+End-to-end load test: one uvicorn worker serving app.main, driven by
+simulated players over HTTP.
+
+Starts the server in a subprocess against a local bot token, with a
+throwaway SQLite database on disk or in RAM (a tmpfs file), and runs N
+players concurrently. Each one authenticates with initData minted
+by fixtures.make_init_data (the same HMAC scheme Telegram uses), then
+plays sessions that look like the client:
+
+    GET  /game/state          (conditional when it already has an ETag)
+    a burst of merges and collects, free buys to refill the grid
+    POST /game/save           once per burst, like the client's debounce
+    GET  /quests/daily, POST /quests/claim for finished quests
+    POST /shop/buy            a booster now and then
+
+Reports requests/sec and p50/p95/p99 latency per route. Everything runs on
+localhost; no network access is needed. The players share the machine with
+the server, so give the server a core of its own when reading the numbers.
+
+Run from backend/:
+    python -m benchmarks.loadtest                        # both databases, defaults
+    python -m benchmarks.loadtest --db memory --users 500 --duration 60
+    python -m benchmarks.loadtest --think 0              # no think time: saturate the worker
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from .fixtures import BENCH_BOT_TOKEN, make_init_data
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TELEGRAM_ID_BASE = 7_000_000_000
+RAM_DIR = "/dev/shm"
+
+
+# ─── Server ───────────────────────────────────────────────────────────────────
+def make_workdir(db: str) -> str:
+    """A fresh directory for the run's database; run_one removes it afterwards."""
+    if db == "memory":
+        # A file on tmpfs rather than :memory: — the sync and async engines need
+        # the same database, and shared-cache memory databases fail concurrent
+        # writers with "table is locked" instead of waiting on busy_timeout
+        if not os.path.isdir(RAM_DIR):
+            raise SystemExit(f"--db memory needs a tmpfs at {RAM_DIR}")
+        return tempfile.mkdtemp(dir=RAM_DIR)
+    return tempfile.mkdtemp()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{workdir}/loadtest.db",
+        "TELEGRAM_BOT_TOKEN": BENCH_BOT_TOKEN,
+        "ENVIRONMENT": "production",
+        "SECRET_KEY": secrets.token_hex(32),    # session tokens are off under the default key
+        "DEBUG": "false",
+        "GROQ_API_KEY": "",             # creature names from the offline fallback list
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def wait_ready(base_url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with status {proc.returncode}")
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ─── Players ──────────────────────────────────────────────────────────────────
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, seconds: float, status: int) -> None:
+        self.latencies[route].append(seconds)
+        if status >= 500 or status in (401, 403, 404, 429):
+            self.errors[route] += 1
+
+
+class Player:
+    """One simulated client; keeps the last state it fetched, like the app does."""
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, telegram_id: int, rng: random.Random, think: float):
+        self.client = client
+        self.stats = stats
+        self.telegram_id = telegram_id
+        self.rng = rng
+        self.think = think
+        self.headers: dict = {}
+        self.state: dict = {}
+        self.etag = ""
+
+    async def call(self, method: str, path: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        resp = await self.client.request(method, "/api" + path, headers={**self.headers, **kwargs.pop("headers", {})}, **kwargs)
+        self.stats.record(f"{method} {path}", time.perf_counter() - start, resp.status_code)
+        return resp
+
+    async def pause(self, scale: float = 1.0) -> None:
+        if self.think:
+            await asyncio.sleep(self.rng.expovariate(1 / (self.think * scale)))
+
+    async def auth(self) -> None:
+        resp = await self.call("POST", "/auth/telegram", json={},
+                               headers={"X-Telegram-Init-Data": make_init_data(self.telegram_id)})
+        resp.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {resp.json()['sessionToken']}"}
+
+    async def load_state(self) -> None:
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        resp = await self.call("GET", "/game/state", headers=headers)
+        if resp.status_code == 200:
+            self.state = resp.json()
+            self.etag = resp.headers.get("ETag", "")
+
+    async def burst(self) -> None:
+        grid = [c for c in self.state.get("grid", []) if c]
+        by_kind = defaultdict(list)
+        for c in grid:
+            by_kind[(c["family"], c["level"])].append(c["id"])
+        pairs = [ids[:2] for ids in by_kind.values() if len(ids) >= 2]
+        self.rng.shuffle(pairs)
+        for from_id, to_id in pairs[:self.rng.randint(1, 4)]:
+            await self.call("POST", "/game/merge", json={"from_id": from_id, "to_id": to_id})
+            await self.pause(0.3)
+        for c in self.rng.sample(grid, min(len(grid), self.rng.randint(1, 5))):
+            await self.call("POST", "/game/collect", json={"creature_id": c["id"]})
+            await self.pause(0.3)
+        for _ in range(self.rng.randint(0, 3)):
+            await self.call("POST", "/shop/buy", json={"item_id": "buy_fairy_cat_1"})
+
+    async def quests(self) -> None:
+        resp = await self.call("GET", "/quests/daily")
+        if resp.status_code != 200:
+            return
+        for q in resp.json():
+            if q.get("completed") and not q.get("claimedAt"):
+                await self.call("POST", "/quests/claim", json={"quest_id": q["id"]})
+
+    async def session(self, deadline: float) -> None:
+        await self.auth()
+        await self.load_state()
+        while time.monotonic() < deadline:
+            await self.burst()
+            await self.load_state()
+            await self.pause()
+            # The client debounces saves; one per burst
+            await self.call("POST", "/game/save", json={"state": self.state})
+            if self.rng.random() < 0.3:
+                await self.quests()
+            if self.rng.random() < 0.1:
+                await self.call("POST", "/shop/buy", json={"item_id": "boost_2x_60"})
+            await self.pause(3)
+
+
+async def run_load(base_url: str, users: int, duration: float, think: float, seed: int) -> tuple[Stats, float]:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        rng = random.Random(seed)
+        players = [Player(client, stats, TELEGRAM_ID_BASE + i, random.Random(rng.random()), think) for i in range(users)]
+        start = time.monotonic()
+        # Players arrive over the first tenth of the run rather than all at once
+        ramp = duration / 10
+
+        async def play(i: int, player: Player):
+            await asyncio.sleep(ramp * i / users)
+            await player.session(start + duration)
+
+        # Stop everyone at the deadline rather than letting each finish its
+        # burst and pause: the tail would stretch the run while only a few
+        # players are still active, understating req/s. Requests still in
+        # flight then are dropped, so every recorded one falls in the window.
+        tasks = [asyncio.create_task(play(i, p)) for i, p in enumerate(players)]
+        _, running = await asyncio.wait(tasks, timeout=duration)
+        elapsed = time.monotonic() - start
+        for task in running:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                raise result
+        return stats, elapsed
+
+
+# ─── Report ───────────────────────────────────────────────────────────────────
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def report(label: str, stats: Stats, elapsed: float) -> None:
+    total = sum(len(v) for v in stats.latencies.values())
+    print(f"\n{label}: {total:,} requests in {elapsed:.1f}s = {total / elapsed:,.0f} req/s")
+    print(f"{'route':<22} {'count':>7} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for route in sorted(stats.latencies, key=lambda r: -len(stats.latencies[r])):
+        ts = sorted(stats.latencies[route])
+        print(f"{route:<22} {len(ts):7d} {len(ts) / elapsed:7.1f} "
+              f"{percentile(ts, 0.50) * 1e3:8.1f} {percentile(ts, 0.95) * 1e3:8.1f} {percentile(ts, 0.99) * 1e3:8.1f} "
+              f"{stats.errors.get(route, 0):7d}")
+
+
+async def run_one(db: str, args) -> None:
+    port = _free_port()
+    workdir = make_workdir(db)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        proc = start_server(workdir, port)
+        try:
+            await wait_ready(base_url, proc)
+            stats, elapsed = await run_load(base_url, args.users, args.duration, args.think, args.seed)
+        finally:
+            stop_server(proc)
+    finally:
+        # Don't leave databases behind, least of all in RAM on /dev/shm
+        shutil.rmtree(workdir, ignore_errors=True)
+    report(f"{db} ({args.users} players, think {args.think}s)", stats, elapsed)
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    parser.add_argument("--db", choices=["sqlite", "memory", "both"], default="both")
+    parser.add_argument("--users", type=int, default=100, help="concurrent players (default 100)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per run (default 30)")
+    parser.add_argument("--think", type=float, default=0.5,
+                        help="mean pause between a player's actions, in seconds; 0 for none (default 0.5)")
+    parser.add_argument("--seed", type=int, default=24)
+    args = parser.parse_args(argv)
+
+    for db in (["sqlite", "memory"] if args.db == "both" else [args.db]):
+        asyncio.run(run_one(db, args))
+
+
+if __name__ == "__main__":
+    main()
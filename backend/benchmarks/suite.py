@@ -0,0 +1,266 @@
+"""
+Perf-regression suite for the hot paths in game_service, the state codec
+and telegram_auth.
+
+Each case times one operation on generated fixtures (empty, typical and
+full 40-slot grids, a user with many quests, one with many buildings) and
+reports ops/sec from the best of several rounds. Mutating actions get a
+fresh GameState per call, built outside the timed loop.
+
+Run from backend/:
+    python -m benchmarks.suite run -o benchmarks/baselines/local.json
+    python -m benchmarks.suite compare benchmarks/baselines/local.json         # runs the suite now
+    python -m benchmarks.suite compare base.json current.json --threshold 0.15
+
+compare exits with status 1 if any case's ops/sec fell more than the
+threshold (default 10%) below the baseline. -k limits either command to
+cases whose name contains the given text.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable
+
+from app import game_service, serializer
+from app.game_data import SHOP_ITEMS
+from app.game_state import GameState
+from app.state_codec import encode_state, decode_state
+from app.telegram_auth import verify_telegram_init_data, clear_init_data_cache
+from .fixtures import BENCH_BOT_TOKEN, make_init_data, make_state
+
+ROUNDS = 7
+ROUND_SEC = 0.05
+QUICK_ROUNDS = 3
+
+FIXTURES = {
+    "empty":          dict(filled_slots=0, buildings=0, quests=4),
+    "typical":        dict(filled_slots=20, buildings=2, quests=4),
+    "full":           dict(filled_slots=40, buildings=3, quests=4),
+    "many_quests":    dict(filled_slots=20, buildings=2, quests=200),
+    "many_buildings": dict(filled_slots=20, buildings=60, quests=4),
+}
+
+
+def fixture(name: str) -> dict:
+    state = make_state(random.Random(name), **FIXTURES[name])
+    if FIXTURES[name]["filled_slots"] >= 40:
+        state["unlockedSlots"] = 40
+    return state
+
+
+def _creature(cid: int, family: str, level: int, collected_ms: int) -> dict:
+    return {
+        "id": cid, "family": family, "level": level, "lastCollected": collected_ms,
+        "pendingResources": {"leaves": 0, "dew": 0, "berries": 0}, "isCollecting": False,
+    }
+
+
+# ─── Cases ────────────────────────────────────────────────────────────────────
+# Each case builds (make, op): make() returns the argument for one call and is
+# not timed; op(arg) is the timed operation.
+def _merge(state: dict):
+    # A mergeable pair in the first two slots, on top of whatever the fixture has
+    hour_ago = int(time.time() * 1000) - 3_600_000
+    state["grid"][0] = _creature(900_001, "fairy_cat", 2, hour_ago)
+    state["grid"][1] = _creature(900_002, "fairy_cat", 2, hour_ago)
+    return lambda: GameState.from_dict(state), lambda gs: game_service.perform_merge(gs, 900_001, 900_002)
+
+
+def _collect(state: dict):
+    state["grid"][0] = _creature(900_001, "baby_dragon", 3, int(time.time() * 1000) - 3_600_000)
+    return lambda: GameState.from_dict(state), lambda gs: game_service.perform_collect(gs, 900_001)
+
+
+def _buy(item_id: str):
+    def case(state: dict):
+        state["resources"] = {"leaves": 10**9, "dew": 10**9, "berries": 10**6}
+        if SHOP_ITEMS[item_id]["category"] == "creature":
+            state["grid"][0] = None     # somewhere to put it
+        return lambda: GameState.from_dict(state), lambda gs: game_service.perform_buy(gs, item_id)
+    return case
+
+
+def _claim(state: dict):
+    quest = dict(state["dailyQuests"][-1], id="q_bench", claimedAt=None, completed=True)
+    quest["currentAmount"] = quest["targetAmount"]
+    state["dailyQuests"] = state["dailyQuests"][:-1] + [quest]
+    return lambda: GameState.from_dict(state), lambda gs: game_service.claim_quest(gs, "q_bench")
+
+
+def _quest_event(state: dict):
+    earned = {"leaves": 40, "dew": 6, "berries": 0}
+    return lambda: GameState.from_dict(state), lambda gs: gs.quest_event("collect", 46, "fairy_cat", earned)
+
+
+def _offline_bonus(state: dict):
+    gs = GameState.from_dict(state)
+    now_ms = gs.last_online + 6 * 3_600_000
+    return lambda: gs, lambda s: game_service.calculate_offline_bonus(s, now_ms)
+
+
+def _json_roundtrip(state: dict):
+    return lambda: state, lambda s: serializer.loads(serializer.dumps(s))
+
+
+def _codec_roundtrip(state: dict):
+    return lambda: state, lambda s: decode_state(encode_state(s))
+
+
+def _gamestate_roundtrip(state: dict):
+    return lambda: state, lambda s: GameState.from_dict(s).to_dict()
+
+
+def _verify_init_data(use_cache: bool):
+    def case(_state: dict):
+        init_data = make_init_data(424242)
+        clear_init_data_cache()
+        return lambda: init_data, lambda d: verify_telegram_init_data(d, BENCH_BOT_TOKEN, use_cache=use_cache)
+    return case
+
+
+CASES: dict[str, tuple[Callable, Iterable[str]]] = {
+    "perform_merge":           (_merge, ("empty", "typical", "full", "many_quests")),
+    "perform_collect":         (_collect, ("typical", "full", "many_quests", "many_buildings")),
+    "perform_buy[creature]":   (_buy("buy_fairy_cat_1"), ("empty", "typical")),
+    "perform_buy[booster]":    (_buy("boost_2x_60"), ("typical", "full")),
+    "claim_quest":             (_claim, ("typical", "many_quests")),
+    "quest_event":             (_quest_event, ("typical", "many_quests")),
+    "calculate_offline_bonus": (_offline_bonus, ("empty", "typical", "full")),
+    "state_json_roundtrip":    (_json_roundtrip, ("typical", "full", "many_quests")),
+    "state_codec_roundtrip":   (_codec_roundtrip, ("typical", "full")),
+    "gamestate_roundtrip":     (_gamestate_roundtrip, ("typical", "full")),
+    "verify_init_data[uncached]": (_verify_init_data(False), ("typical",)),
+    "verify_init_data[cached]":   (_verify_init_data(True), ("typical",)),
+}
+assert "boost_2x_60" in SHOP_ITEMS and "buy_fairy_cat_1" in SHOP_ITEMS
+
+
+# ─── Runner ───────────────────────────────────────────────────────────────────
+def _time_round(make: Callable, op: Callable, calls: int) -> float:
+    args = [make() for _ in range(calls)]
+    # Like timeit: keep collections of the prepared states out of the timing
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for a in args:
+            op(a)
+        return calls / (time.perf_counter() - start)
+    finally:
+        gc.enable()
+
+
+def measure(make: Callable, op: Callable, rounds: int) -> list[float]:
+    # Size a round to take about ROUND_SEC
+    calls = 16
+    while True:
+        rate = _time_round(make, op, calls)
+        if calls / rate >= ROUND_SEC / 4 or calls >= 1 << 20:
+            break
+        calls *= 4
+    calls = max(16, int(rate * ROUND_SEC))
+    _time_round(make, op, calls)    # warm-up
+    return [_time_round(make, op, calls) for _ in range(rounds)]
+
+
+def run_suite(name_filter: str = "", rounds: int = ROUNDS, verbose: bool = True) -> dict:
+    results = {}
+    for case, (build, fixtures) in CASES.items():
+        for fx in fixtures:
+            name = f"{case}/{fx}"
+            if name_filter and name_filter not in name:
+                continue
+            make, op = build(fixture(fx))
+            rates = measure(make, op, rounds)
+            # Best round, as timeit advises: slower rounds measure interference
+            # from the rest of the machine, not the code
+            results[name] = {
+                "ops_per_sec": max(rates),
+                "median": statistics.median(rates),
+                "rounds": [round(r, 1) for r in rates],
+            }
+            if verbose:
+                print(f"{name:45s} {results[name]['ops_per_sec']:14,.0f} ops/s", file=sys.stderr)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_engine": serializer.ENGINE,
+            "rounds": rounds,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Print a comparison table; returns the names of regressed cases."""
+    regressed = []
+    print(f"{'case':45s} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        change = cur["ops_per_sec"] / base["ops_per_sec"] - 1
+        flag = ""
+        if change < -threshold:
+            regressed.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:45s} {base['ops_per_sec']:12,.0f} {cur['ops_per_sec']:12,.0f} {change:+8.1%}{flag}")
+    for name in current["results"].keys() - baseline["results"].keys():
+        print(f"{name:45s} {'—':>12} {current['results'][name]['ops_per_sec']:12,.0f}   (new)")
+    return regressed
+
+
+def _load(path: str) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the suite and optionally save the results")
+    run.add_argument("-o", "--output", help="write results JSON here (e.g. a new baseline)")
+    run.add_argument("-k", dest="filter", default="", help="only cases whose name contains this")
+    run.add_argument("--quick", action="store_true", help=f"{QUICK_ROUNDS} rounds instead of {ROUNDS}")
+
+    cmp = sub.add_parser("compare", help="fail if ops/sec regressed against a baseline")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current", nargs="?", help="results JSON; runs the suite if omitted")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, as a fraction (default 0.10)")
+    cmp.add_argument("-k", dest="filter", default="", help="only cases whose name contains this")
+    cmp.add_argument("--quick", action="store_true")
+
+    args = parser.parse_args(argv)
+    rounds = QUICK_ROUNDS if args.quick else ROUNDS
+
+    if args.command == "run":
+        results = run_suite(args.filter, rounds)
+        if args.output:
+            Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+            print(f"saved {len(results['results'])} results to {args.output}", file=sys.stderr)
+        return 0
+
+    baseline = _load(args.baseline)
+    if args.filter:
+        baseline["results"] = {k: v for k, v in baseline["results"].items() if args.filter in k}
+    current = _load(args.current) if args.current else run_suite(args.filter, rounds)
+    regressed = compare(baseline, current, args.threshold)
+    if regressed:
+        print(f"\n{len(regressed)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    print(f"\nno regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
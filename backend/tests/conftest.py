@@ -0,0 +1,31 @@
+"""
+The app reads its settings at import time, so point it at a throwaway
+SQLite database (and dev-mode auth) before anything imports it.
+"""
+import os
+import tempfile
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/test.db",
+    "ENVIRONMENT": "development",
+    "DEBUG": "false",
+    "TELEGRAM_BOT_TOKEN": "",
+    "GROQ_API_KEY": "",
+    "SAVE_COALESCING": "false",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client) -> dict:
+    token = client.post("/api/auth/telegram", json={}).json()["sessionToken"]
+    return {"Authorization": f"Bearer {token}"}
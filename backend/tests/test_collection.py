@@ -0,0 +1,32 @@
+"""The stored bestiary is keyed by family and level, not by catalog position."""
+from app.collection import Collection, _V1_ORDER
+from app.game_data import CREATURE_INDEX
+
+
+def test_stored_form_is_keyed_by_family():
+    c = Collection()
+    c.discover("baby_dragon", 1, 5, merged=2)
+    c.discover("baby_dragon", 3, 9)
+    assert c.to_compact() == {"baby_dragon": {"mask": 0b101, "merged": [2, 0, 0], "at": [5, 0, 9]}}
+
+
+def test_round_trip():
+    c = Collection()
+    for i, (family, level) in enumerate(CREATURE_INDEX):
+        if i % 3:
+            c.discover(family, level, 1000 + i, merged=i)
+    assert Collection.from_compact(c.to_compact()).to_list() == c.to_list()
+
+
+def test_reads_single_mask_blobs_in_their_catalog_order():
+    i = _V1_ORDER.index(("baby_dragon", 1))
+    legacy = {"mask": format(1 << i, "x"), "merged": [0] * i + [4], "at": [0] * i + [77]}
+    assert Collection.from_compact(legacy).to_list() == [
+        {"family": "baby_dragon", "level": 1, "discoveredAt": 77, "totalMerged": 4},
+    ]
+
+
+def test_unknown_families_and_levels_are_dropped():
+    c = Collection.from_compact({"retired": {"mask": 1, "merged": [1], "at": [1]},
+                                 "fairy_cat": {"mask": 1 << 40, "merged": [], "at": []}})
+    assert len(c) == 0
@@ -0,0 +1,23 @@
+"""/api/metrics: served in development, off or token-protected elsewhere."""
+import pytest
+
+from app.config import Settings, metrics_on
+
+
+def test_metrics_endpoint(client):
+    client.get("/api/health")
+    resp = client.get("/api/metrics")
+    assert resp.status_code == 200
+    assert 'http_requests_total{method="GET",route="/api/health",status="200"}' in resp.text
+
+
+@pytest.mark.parametrize("environment, enabled, token, expected", [
+    ("development", None,  "",    True),
+    ("production",  None,  "",    False),
+    ("production",  None,  "tok", True),
+    ("production",  True,  "",    True),
+    ("development", False, "",    False),
+])
+def test_metrics_default(environment, enabled, token, expected):
+    settings = Settings(environment=environment, metrics_enabled=enabled, metrics_token=token)
+    assert metrics_on(settings) is expected
@@ -0,0 +1,33 @@
+"""The vectorized offline engine against the scalar calculate_offline_bonus."""
+import random
+
+from app.game_data import FAMILY_IDS, MAX_GRID_SIZE, MAX_LEVEL, MAX_OFFLINE_HOURS, SUBSCRIPTION_BENEFITS
+from app.game_service import calculate_offline_bonus
+from app.offline_engine import offline_bonus_batch
+
+NOW_MS = 1_700_000_000_000
+
+
+def _random_state(rng: random.Random) -> dict:
+    grid = [None] * MAX_GRID_SIZE
+    for i in range(MAX_GRID_SIZE):
+        if rng.random() < 0.7:
+            family = rng.choice(FAMILY_IDS) if rng.random() < 0.95 else "retired_family"
+            grid[i] = {"id": f"c{i}", "family": family, "level": rng.randint(1, MAX_LEVEL + 1)}
+    offline_ms = rng.choice([
+        rng.randint(0, 60_000),
+        rng.randint(0, MAX_OFFLINE_HOURS * 3600 * 1000),
+        rng.randint(MAX_OFFLINE_HOURS * 3600 * 1000, 3 * 24 * 3600 * 1000),
+    ])
+    return {
+        "grid": grid,
+        "lastOnline": NOW_MS - offline_ms,
+        "subscription": rng.choice(["none", *SUBSCRIPTION_BENEFITS]),
+        "subscriptionExpires": NOW_MS - rng.randint(-8 * 3600 * 1000, 8 * 3600 * 1000),
+    }
+
+
+def test_batch_matches_scalar():
+    rng = random.Random(11)
+    states = [_random_state(rng) for _ in range(500)]
+    assert offline_bonus_batch(states, NOW_MS) == [calculate_offline_bonus(s, NOW_MS) for s in states]
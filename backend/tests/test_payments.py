@@ -0,0 +1,19 @@
+"""The Telegram payment webhook applies purchases on the async session."""
+from app.serializer import dumps
+
+
+def test_webhook_applies_stars_purchase(client, auth_headers):
+    before = client.get("/api/game/state", headers=auth_headers)
+    update = {"message": {
+        "from": {"id": 12345678},
+        "successful_payment": {
+            "invoice_payload": dumps({"item_id": "extra_slots_5", "user_id": 12345678}).decode(),
+            "total_amount": 50,
+            "telegram_payment_charge_id": "charge-webhook-test",
+        },
+    }}
+    assert client.post("/api/payments/webhook", json=update).json() == {"ok": True}
+
+    after = client.get("/api/game/state", headers=auth_headers)
+    assert after.json()["unlockedSlots"] == before.json()["unlockedSlots"] + 5
+    assert int(after.headers["X-State-Version"]) > int(before.headers["X-State-Version"])
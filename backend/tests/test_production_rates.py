@@ -0,0 +1,44 @@
+"""GameState's maintained production aggregate against a recompute from the grid."""
+import random
+
+from app import game_service
+from app.game_data import CREATURE_INDEX, INTERVAL_CLASS, INTERVAL_CLASSES, PRODUCTION, SHOP_ITEMS
+from app.game_state import GameState
+from benchmarks.fixtures import make_state
+
+SHOP_NO_BOOSTERS = [item_id for item_id, item in SHOP_ITEMS.items() if item["category"] != "booster"]
+
+
+def _recompute(grid: list) -> list[list[int]]:
+    rates = [[0, 0, 0] for _ in INTERVAL_CLASSES]
+    for c in grid:
+        k = c and CREATURE_INDEX.get((c["family"], c["level"]))
+        if k is None:
+            continue
+        for r, amount in enumerate(PRODUCTION[k]):
+            rates[INTERVAL_CLASS[k]][r] += amount
+    return rates
+
+
+def test_rates_follow_every_action():
+    rng = random.Random(21)
+    for _ in range(30):
+        data = make_state(rng, filled_slots=rng.randint(0, 40))
+        data["resources"] = {"leaves": 10**7, "dew": 10**6, "berries": 10**4}
+        state = GameState.from_dict(data)
+        assert state.production_rates() == _recompute(state.grid)
+        for _ in range(100):
+            ids = [c["id"] for c in state.grid if c]
+            op = rng.random()
+            try:
+                if op < 0.5 and len(ids) >= 2:
+                    game_service.perform_merge(state, *rng.sample(ids, 2))
+                elif op < 0.75:
+                    game_service.perform_buy(state, rng.choice(SHOP_NO_BOOSTERS))
+                elif op < 0.85:
+                    game_service.apply_referrer_reward(state)
+                elif ids:
+                    game_service.perform_collect(state, rng.choice(ids))
+            except ValueError:
+                pass
+            assert state.production_rates() == _recompute(state.grid)
@@ -0,0 +1,73 @@
+"""
+SQL statements issued per route, with a session token (the user is looked
+up by primary key) and SAVE_COALESCING off (saves write through).
+"""
+import pytest
+from sqlalchemy import event
+
+from app.database import engine, async_engine
+
+
+@pytest.fixture
+def statements():
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for e in engines:
+        event.listen(e, "before_cursor_execute", record)
+    yield seen
+    for e in engines:
+        event.remove(e, "before_cursor_execute", record)
+
+
+def _verbs(statements: list[str]) -> list[str]:
+    return [s.split(None, 1)[0].upper() for s in statements]
+
+
+@pytest.mark.parametrize("method, path, body, expected", [
+    ("GET",  "/api/shop/items",       None,                              []),
+    ("GET",  "/api/quests/daily",     None,                              ["SELECT"]),
+    ("POST", "/api/game/collect",     {"creature_id": 1},                ["SELECT", "UPDATE"]),
+    ("POST", "/api/shop/buy",         {"item_id": "buy_fairy_cat_1"},    ["SELECT", "UPDATE"]),
+    ("POST", "/api/game/collect-all", None,                              ["SELECT"]),  # nothing ready: no write
+    ("POST", "/api/quests/claim",     {"quest_id": "missing"},           ["SELECT"]),  # rejected before writing
+    # user, "already referred?", the referrer (unknown code: 404)
+    ("POST", "/api/referral/apply",   {"code": "NO_SUCH_CODE"},          ["SELECT", "SELECT", "SELECT"]),
+])
+def test_route_statements(client, auth_headers, statements, method, path, body, expected):
+    resp = client.request(method, path, json=body, headers=auth_headers)
+    assert resp.status_code < 500, resp.text
+    assert _verbs(statements) == expected
+
+
+def test_state_defers_blob_until_etag_miss(client, auth_headers, statements):
+    resp = client.get("/api/game/state", headers=auth_headers)
+    assert resp.status_code == 200
+    # Projected user row, then the blob
+    assert _verbs(statements) == ["SELECT", "SELECT"]
+    assert "game_state" not in statements[0]
+
+    statements.clear()
+    resp = client.get("/api/game/state", headers={**auth_headers, "If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+    assert _verbs(statements) == ["SELECT"]
+    assert "game_state" not in statements[0]
+
+
+def test_save_and_merge_write_once(client, auth_headers, statements):
+    state = client.get("/api/game/state", headers=auth_headers).json()
+    statements.clear()
+    assert client.post("/api/game/save", json={"state": state}, headers=auth_headers).status_code == 200
+    assert _verbs(statements) == ["SELECT", "UPDATE"]
+
+    client.post("/api/shop/buy", json={"item_id": "buy_fairy_cat_1"}, headers=auth_headers)
+    client.post("/api/shop/buy", json={"item_id": "buy_fairy_cat_1"}, headers=auth_headers)
+    grid = client.get("/api/game/state", headers=auth_headers).json()["grid"]
+    cats = [c["id"] for c in grid if c and c["family"] == "fairy_cat" and c["level"] == 1]
+    statements.clear()
+    resp = client.post("/api/game/merge", json={"from_id": cats[0], "to_id": cats[1]}, headers=auth_headers)
+    assert resp.status_code == 200, resp.text
+    assert _verbs(statements) == ["SELECT", "UPDATE"]
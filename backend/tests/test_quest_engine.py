@@ -0,0 +1,39 @@
+"""The linear scan for short quest lists against the event index."""
+import random
+
+from app.game_data import FAMILY_IDS, RESOURCES
+from app.quest_engine import QuestEvent, QuestIndex, apply_event, scan_event
+
+
+def _quests(rng: random.Random, count: int) -> list[dict]:
+    quests = []
+    for i in range(count):
+        kind = rng.choice(["merge", "collect", "collect_type", "unknown"])
+        q = {"id": f"q_{i}", "type": kind, "targetAmount": rng.randint(1, 300), "currentAmount": 0,
+             "completed": False, "claimedAt": None}
+        if kind.startswith("collect"):
+            q["targetResource"] = rng.choice(RESOURCES)
+        if kind == "collect_type":
+            q["targetFamily"] = rng.choice(FAMILY_IDS)
+        if rng.random() < 0.1:
+            q["claimedAt"] = 1
+        quests.append(q)
+    return quests
+
+
+def test_scan_matches_index():
+    rng = random.Random(17)
+    for _ in range(200):
+        quests = _quests(rng, rng.randint(0, 20))
+        scanned, indexed = list(quests), list(quests)
+        index = QuestIndex(indexed)
+        for _ in range(50):
+            family = rng.choice(FAMILY_IDS)
+            if rng.random() < 0.4:
+                event = ("merge", 1, family, None)
+            else:
+                earned = {r: rng.randint(0, 40) for r in RESOURCES}
+                event = ("collect", sum(earned.values()), family, earned)
+            scan_event(scanned, *event)
+            apply_event(indexed, index, QuestEvent(*event))
+        assert scanned == indexed
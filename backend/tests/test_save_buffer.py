@@ -0,0 +1,108 @@
+"""Write-behind saves survive a flush being cancelled or failing mid-write."""
+import asyncio
+
+from app.config import get_settings
+from app.database import SessionLocal, make_engine
+from app.game_service import default_game_state
+from app.models import User
+from app.save_buffer import SaveCoalescer
+from app.state_codec import decode_state, encode_state
+
+TELEGRAM_ID = 60_000_001
+FAILED_FLUSH_ID = 60_000_002
+
+
+class _StalledEngine:
+    """begin() never gets a connection, like a flush waiting on a busy database."""
+
+    def begin(self):
+        return self
+
+    async def __aenter__(self):
+        await asyncio.Event().wait()
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FailingEngine:
+    """begin() waits until released, then fails, like "database is locked"."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    def begin(self):
+        return self
+
+    async def __aenter__(self):
+        await self.release.wait()
+        raise RuntimeError("database is locked")
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _add_user(telegram_id: int) -> bytes:
+    base = encode_state(default_game_state())
+    with SessionLocal() as db:
+        db.add(User(telegram_id=telegram_id, first_name="Flush", game_state=base, created_at=0, last_seen=0))
+        db.commit()
+    return base
+
+
+async def _flush_for_real(buffer: SaveCoalescer) -> int:
+    engine = make_engine(get_settings(), use_async=True)
+    try:
+        return await buffer.flush(engine)
+    finally:
+        await engine.dispose()
+
+
+def _stored(telegram_id: int) -> tuple[dict, int]:
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.telegram_id == telegram_id).one()
+        return decode_state(user.game_state), user.state_version
+
+
+def test_cancelled_flush_is_written_by_the_next_one(client):
+    base = _add_user(TELEGRAM_ID)
+
+    buffer = SaveCoalescer(batch_size=100)
+    state = default_game_state()
+    state["resources"]["leaves"] = 777
+    buffer.enqueue(TELEGRAM_ID, base, state, 1)
+
+    async def shutdown_during_flush() -> int:
+        flushing = asyncio.create_task(buffer.flush(_StalledEngine()))
+        await asyncio.sleep(0.01)
+        flushing.cancel()
+        await asyncio.gather(flushing, return_exceptions=True)
+        return await _flush_for_real(buffer)
+
+    assert asyncio.run(shutdown_during_flush()) == 1
+    state, version = _stored(TELEGRAM_ID)
+    assert state["resources"]["leaves"] == 777
+    assert version == 1
+
+
+def test_save_made_during_a_failed_flush_is_written_by_the_retry(client):
+    base = _add_user(FAILED_FLUSH_ID)
+    buffer = SaveCoalescer(batch_size=100)
+    first, second = default_game_state(), default_game_state()
+    first["resources"]["leaves"] = 777
+    second["resources"]["leaves"] = 888
+    buffer.enqueue(FAILED_FLUSH_ID, base, first, 1)
+
+    async def save_during_failing_flush() -> int:
+        engine = _FailingEngine()
+        flushing = asyncio.create_task(buffer.flush(engine))
+        await asyncio.sleep(0.01)
+        buffer.enqueue(FAILED_FLUSH_ID, base, second, 2)    # based on the in-flight blob
+        engine.release.set()
+        await asyncio.gather(flushing, return_exceptions=True)
+        return await _flush_for_real(buffer)
+
+    assert asyncio.run(save_during_failing_flush()) == 1
+    state, version = _stored(FAILED_FLUSH_ID)
+    assert state["resources"]["leaves"] == 888
+    assert version == 2
@@ -0,0 +1,44 @@
+"""Version checks on delta saves, and the version auth hands the client."""
+from sqlalchemy import text
+
+from app.database import engine
+from app.routes import game
+
+
+def _current(client, auth_headers) -> int:
+    return int(client.get("/api/game/state", headers=auth_headers).headers["X-State-Version"])
+
+
+def test_auth_returns_state_version(client, auth_headers):
+    assert client.post("/api/auth/telegram", json={}).json()["stateVersion"] == _current(client, auth_headers)
+
+
+def test_patch_applies_on_current_version(client, auth_headers):
+    base = _current(client, auth_headers)
+    patch = [{"op": "replace", "path": "/resources/leaves", "value": 30}]
+    resp = client.patch("/api/game/state", json={"base_version": base, "patch": patch}, headers=auth_headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["version"] == base + 1 == _current(client, auth_headers)
+
+    stale = client.patch("/api/game/state", json={"base_version": base, "patch": patch}, headers=auth_headers)
+    assert stale.status_code == 409
+    assert stale.headers["X-State-Version"] == str(base + 1)
+
+
+def test_patch_loses_race_to_concurrent_write(client, auth_headers, monkeypatch):
+    base = _current(client, auth_headers)
+    apply_patch = game.apply_patch
+
+    def commit_concurrent_save_first(doc, patch):
+        # Another request with the same base_version commits while this one
+        # is between its version check and its write
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE users SET state_version = state_version + 1 WHERE telegram_id = 12345678"))
+        return apply_patch(doc, patch)
+
+    monkeypatch.setattr(game, "apply_patch", commit_concurrent_save_first)
+    patch = [{"op": "replace", "path": "/resources/leaves", "value": 40}]
+    resp = client.patch("/api/game/state", json={"base_version": base, "patch": patch}, headers=auth_headers)
+    assert resp.status_code == 409
+    assert resp.headers["X-State-Version"] == str(base + 1)
+    assert _current(client, auth_headers) == base + 1
@@ -0,0 +1,27 @@
+"""The cumulative XP table against subtracting xp_for_level one level at a time."""
+import random
+
+from app.xp_table import resolve_level, resolve_levels, total_xp, xp_for_level
+
+
+def _loop_resolve(level: int, exp: int) -> tuple[int, int]:
+    while exp >= xp_for_level(level + 1):
+        exp -= xp_for_level(level + 1)
+        level += 1
+    return level, exp
+
+
+def test_resolve_matches_loop():
+    rng = random.Random(16)
+    cases = []
+    for level in range(1, 300):
+        step = xp_for_level(level + 1)
+        cases += [(level, 0), (level, step - 1), (level, step), (level, step + xp_for_level(level + 2))]
+    for _ in range(5000):
+        level = rng.randint(1, 250)
+        cases.append((level, rng.randint(0, total_xp(level + rng.randint(1, 50), 0) - total_xp(level, 0))))
+    cases += [(0, 500), (-3, 1000), (5, -20)]
+
+    expected = [_loop_resolve(l, e) for l, e in cases]
+    assert [resolve_level(l, e) for l, e in cases] == expected
+    assert resolve_levels(cases) == expected
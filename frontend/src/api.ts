@@ -1,35 +1,51 @@
-import type { GameState, ApiResponse, Quest, ShopItem } from './types'
+import type { GameState, ApiResponse, Quest, ShopItem, CreatureId } from './types'
 
 const BASE_URL = import.meta.env.VITE_API_URL || '/api'
 
 let _initData = ''
+let _sessionToken = ''
 
 export function setInitData(initData: string) {
   _initData = initData
 }
 
+export function setSessionToken(token: string) {
+  _sessionToken = token
+}
+
 async function request<T>(
   method: string,
   path: string,
   body?: unknown
 ): Promise<ApiResponse<T>> {
+  const res = await send<T>(method, path, body)
+  return res.response
+}
+
+// request() plus the raw Response, for callers that need its headers
+async function send<T>(
+  method: string,
+  path: string,
+  body?: unknown
+): Promise<{ response: ApiResponse<T>; headers?: Headers }> {
   try {
     const res = await fetch(`${BASE_URL}${path}`, {
       method,
       headers: {
         'Content-Type': 'application/json',
         'X-Telegram-Init-Data': _initData,
+        ...(_sessionToken ? { Authorization: `Bearer ${_sessionToken}` } : {}),
       },
       body: body ? JSON.stringify(body) : undefined,
     })
     if (!res.ok) {
       const err = await res.json().catch(() => ({ detail: 'Unknown error' }))
-      return { ok: false, error: err.detail ?? 'Server error' }
+      return { response: { ok: false, status: res.status, error: err.detail ?? 'Server error' }, headers: res.headers }
     }
     const data = await res.json()
-    return { ok: true, data }
+    return { response: { ok: true, data }, headers: res.headers }
   } catch (e) {
-    return { ok: false, error: 'Network error' }
+    return { response: { ok: false, error: 'Network error' } }
   }
 }
 
@@ -45,10 +61,15 @@ export interface AuthResponse {
   referralCode: string
   createdAt: number
   lastSeen: number
+  sessionToken: string
+  sessionExpiresAt: number
+  stateVersion: number
 }
 
 export async function authTelegram(startParam?: string): Promise<ApiResponse<AuthResponse>> {
-  return request('POST', '/auth/telegram', { start_param: startParam })
+  const res = await request<AuthResponse>('POST', '/auth/telegram', { start_param: startParam })
+  if (res.ok && res.data) setSessionToken(res.data.sessionToken)
+  return res
 }
 
 // ─── Game State ───────────────────────────────────────────────────────────────
@@ -56,13 +77,45 @@ export async function fetchGameState(): Promise<ApiResponse<GameState>> {
   return request('GET', '/game/state')
 }
 
-export async function saveGameState(state: GameState): Promise<ApiResponse<{ saved: true }>> {
+export interface VersionedState {
+  state: GameState
+  version: number
+}
+
+// The state together with the version a patch must be based on
+export async function fetchVersionedGameState(): Promise<ApiResponse<VersionedState>> {
+  const { response, headers } = await send<GameState>('GET', '/game/state')
+  const header = headers?.get('X-State-Version')
+  const version = header ? Number(header) : NaN
+  if (!response.ok || !response.data || !Number.isInteger(version)) {
+    return { ok: false, status: response.status, error: response.error ?? 'Missing state version' }
+  }
+  return { ok: true, data: { state: response.data, version } }
+}
+
+export interface SaveResult {
+  saved: true
+  version: number
+}
+
+export async function saveGameState(state: GameState): Promise<ApiResponse<SaveResult>> {
   return request('POST', '/game/save', { state })
 }
 
+export interface PatchOp {
+  op: 'add' | 'remove' | 'replace'
+  path: string
+  value?: unknown
+}
+
+// Delta save; fails (409) if the server state moved past baseVersion
+export async function patchGameState(baseVersion: number, patch: PatchOp[]): Promise<ApiResponse<SaveResult>> {
+  return request('PATCH', '/game/state', { base_version: baseVersion, patch })
+}
+
 // ─── Actions (server-side validation) ────────────────────────────────────────
 export interface MergeResult {
-  newCreatureId: string
+  newCreatureId: number
   newLevel: number
   xpGained: number
   aiName?: string
@@ -70,8 +123,8 @@ export interface MergeResult {
 }
 
 export async function doMerge(
-  fromId: string,
-  toId: string
+  fromId: CreatureId,
+  toId: CreatureId
 ): Promise<ApiResponse<MergeResult>> {
   return request('POST', '/game/merge', { from_id: fromId, to_id: toId })
 }
@@ -81,10 +134,46 @@ export interface CollectResult {
   questProgress?: Partial<Record<string, number>>
 }
 
-export async function doCollect(creatureId: string): Promise<ApiResponse<CollectResult>> {
+export async function doCollect(creatureId: CreatureId): Promise<ApiResponse<CollectResult>> {
   return request('POST', '/game/collect', { creature_id: creatureId })
 }
 
+export interface CollectAllResult {
+  resources: { leaves: number; dew: number; berries: number }
+  collected: number
+}
+
+export async function doCollectAll(): Promise<ApiResponse<CollectAllResult>> {
+  return request('POST', '/game/collect-all')
+}
+
+export interface MergeAllResult {
+  merges: number
+  xpGained: number
+}
+
+export async function doMergeAll(): Promise<ApiResponse<MergeAllResult>> {
+  return request('POST', '/game/merge-all')
+}
+
+export type GameAction =
+  | { type: 'merge'; from_id: CreatureId; to_id: CreatureId }
+  | { type: 'collect'; creature_id: CreatureId }
+  | { type: 'buy'; item_id: string }
+  | { type: 'collect_all' }
+  | { type: 'merge_all' }
+
+export interface ActionsResult {
+  results: Array<MergeResult | CollectResult | BuyResult | CollectAllResult | MergeAllResult>
+  applied: number
+  error: { index: number; detail: string } | null
+}
+
+// Applies actions in order with one server write; stops at the first failure
+export async function doActions(actions: GameAction[]): Promise<ApiResponse<ActionsResult>> {
+  return request('POST', '/game/actions', { actions })
+}
+
 // ─── Shop ─────────────────────────────────────────────────────────────────────
 export async function fetchShopItems(): Promise<ApiResponse<ShopItem[]>> {
   return request('GET', '/shop/items')
@@ -92,8 +181,9 @@ export async function fetchShopItems(): Promise<ApiResponse<ShopItem[]>> {
 
 export interface BuyResult {
   success: boolean
-  newCreatureId?: string
+  newCreatureId?: number
   newSlots?: number
+  boostUntil?: number   // booster end, ms timestamp
   message: string
 }
 
@@ -20,14 +20,6 @@ import {
 import * as api from './api'
 
 // ─── Helpers ──────────────────────────────────────────────────────────────────
-function makeId(): string {
-  // Simple UUID without external dep
-  return 'xxxx-xxxx-4xxx-yxxx'.replace(/[xy]/g, c => {
-    const r = (Math.random() * 16) | 0
-    return (c === 'x' ? r : (r & 0x3) | 0x8).toString(16)
-  }) + '-' + Date.now().toString(36)
-}
-
 function emptyResources(): Resources {
   return { leaves: 0, dew: 0, berries: 0 }
 }
@@ -52,9 +44,10 @@ function canAfford(resources: Resources, cost: Partial<Resources>): boolean {
   )
 }
 
-function newCreature(family: CreatureFamily, level = 1): GridCreature {
+// id comes from GameState.nextCreatureId, same counter the server uses
+function newCreature(id: number, family: CreatureFamily, level = 1): GridCreature {
   return {
-    id: makeId(),
+    id,
     family,
     level,
     lastCollected: Date.now(),
@@ -66,9 +59,9 @@ function newCreature(family: CreatureFamily, level = 1): GridCreature {
 function defaultGameState(): GameState {
   const grid: (GridCreature | null)[] = Array(40).fill(null)
   // Give starter creatures
-  grid[0] = newCreature('fairy_cat', 1)
-  grid[1] = newCreature('fairy_cat', 1)
-  grid[2] = newCreature('mushroom_sprite', 1)
+  grid[0] = newCreature(1, 'fairy_cat', 1)
+  grid[1] = newCreature(2, 'fairy_cat', 1)
+  grid[2] = newCreature(3, 'mushroom_sprite', 1)
 
   return {
     grid,
@@ -86,6 +79,7 @@ function defaultGameState(): GameState {
     dailyQuests: [],
     questLastReset: 0,
     totalMerges: 0,
+    nextCreatureId: 4,
     referralCode: '',
     referralCount: 0,
     subscription: 'none',
@@ -127,13 +121,92 @@ interface AppStore {
   completeOnboardingAndStart: () => void
 }
 
-// Save to backend debounced
+// JSON Patch from the last state the server has to the current one: changed
+// top-level keys, with grid cells diffed one by one
+function diffState(prev: GameState, next: GameState): api.PatchOp[] {
+  const ops: api.PatchOp[] = []
+  const a = prev as unknown as Record<string, unknown>
+  const b = next as unknown as Record<string, unknown>
+  const same = (x: unknown, y: unknown) => x === y || JSON.stringify(x) === JSON.stringify(y)
+
+  for (const key of Object.keys(b)) {
+    if (!(key in a)) {
+      ops.push({ op: 'add', path: `/${key}`, value: b[key] })
+    } else if (key === 'grid' && prev.grid.length === next.grid.length) {
+      next.grid.forEach((cell, i) => {
+        if (!same(cell, prev.grid[i])) ops.push({ op: 'replace', path: `/grid/${i}`, value: cell })
+      })
+    } else if (!same(a[key], b[key])) {
+      ops.push({ op: 'replace', path: `/${key}`, value: b[key] })
+    }
+  }
+  for (const key of Object.keys(a)) {
+    if (!(key in b)) ops.push({ op: 'remove', path: `/${key}` })
+  }
+  return ops
+}
+
+// Apply diffState() output to a state, without mutating it
+function applyOps(state: GameState, ops: api.PatchOp[]): GameState {
+  const out = { ...state, grid: [...state.grid] } as unknown as Record<string, unknown>
+  for (const { op, path, value } of ops) {
+    const [key, index] = path.slice(1).split('/')
+    if (index !== undefined) (out[key] as unknown[])[Number(index)] = value
+    else if (op === 'remove') delete out[key]
+    else out[key] = value
+  }
+  return out as unknown as GameState
+}
+
+// Save to backend debounced — as a patch when we know the server's version.
+// A 409 means the server state moved on (a purchase, a merge, another
+// device): rebase on it and patch again. A full save is only the fallback
+// for having no base version or a patch the server can't apply (400/422).
 let saveTimer: ReturnType<typeof setTimeout> | null = null
+let syncedState: GameState | null = null
+let syncedVersion: number | null = null
+
 function scheduleSave(state: GameState) {
   if (saveTimer) clearTimeout(saveTimer)
-  saveTimer = setTimeout(() => {
-    api.saveGameState(state).catch(() => {})
-  }, 3000)
+  saveTimer = setTimeout(() => { void syncState(state) }, 3000)
+}
+
+async function syncState(state: GameState) {
+  const ops = syncedState && syncedVersion !== null ? diffState(syncedState, state) : null
+  if (ops && ops.length === 0) return
+
+  let res = ops ? await api.patchGameState(syncedVersion!, ops) : null
+  if (res?.status === 409) {
+    const rebasedState = await rebase(state)
+    if (!rebasedState) return   // couldn't fetch the server state; the next save tries again
+    state = rebasedState
+    const rebased = diffState(syncedState!, state)
+    if (rebased.length === 0) return
+    res = await api.patchGameState(syncedVersion!, rebased)
+    if (res.status === 409) {
+      // Moved again in the meantime; go round once more on the next debounce
+      scheduleSave(useStore.getState().gameState)
+      return
+    }
+  }
+  if (!res || res.status === 400 || res.status === 422) res = await api.saveGameState(state)
+  if (res.ok && res.data) {
+    syncedState = state
+    syncedVersion = res.data.version
+  }
+}
+
+// Take the server's state and version as the new base, and replay what
+// changed there since our old base onto the local state (server wins
+// where both changed the same key or cell)
+async function rebase(state: GameState): Promise<GameState | null> {
+  const server = await api.fetchVersionedGameState()
+  if (!server.ok || !server.data) return null
+  const theirs = syncedState ? diffState(syncedState, server.data.state) : []
+  syncedState = server.data.state
+  syncedVersion = server.data.version
+  if (theirs.length) useStore.setState(s => ({ gameState: applyOps(s.gameState, theirs) }))
+  return applyOps(state, theirs)
 }
 
 // ─── Store ────────────────────────────────────────────────────────────────────
@@ -160,8 +233,11 @@ export const useStore = create<AppStore>((set, get) => ({
       return
     }
 
-    const { gameState, isNewUser, referralCode, ...profileData } = res.data
-    const fullState: GameState = { ...gameState, referralCode }
+    const { gameState, isNewUser, referralCode, stateVersion, ...profileData } = res.data
+    // Saves from before int creature ids have no counter (and only string ids)
+    const fullState: GameState = { nextCreatureId: 1, ...gameState, referralCode }
+    syncedState = { ...fullState }
+    syncedVersion = stateVersion
 
     // Restore grid creatures (they come serialised from backend)
     const restoredGrid = fullState.grid.map(cell =>
@@ -241,7 +317,7 @@ export const useStore = create<AppStore>((set, get) => ({
       }
       // Perform merge
       const newLevel = source.level + 1
-      const merged = newCreature(source.family, newLevel)
+      const merged = newCreature(gameState.nextCreatureId, source.family, newLevel)
       const newGrid = [...grid]
       newGrid[index] = merged
       newGrid[selectedCell] = null
@@ -273,6 +349,7 @@ export const useStore = create<AppStore>((set, get) => ({
         experience,
         level,
         totalMerges: gameState.totalMerges + 1,
+        nextCreatureId: gameState.nextCreatureId + 1,
         discoveredCreatures: disc,
         dailyQuests: quests,
       }
@@ -356,7 +433,7 @@ export const useStore = create<AppStore>((set, get) => ({
       return
     }
 
-    const creature = newCreature(family, level)
+    const creature = newCreature(gameState.nextCreatureId, family, level)
     const newGrid = [...gameState.grid]
     newGrid[emptySlot] = creature
 
@@ -373,6 +450,7 @@ export const useStore = create<AppStore>((set, get) => ({
       grid: newGrid,
       resources: newResources,
       discoveredCreatures: disc,
+      nextCreatureId: gameState.nextCreatureId + 1,
     }
 
     set({ gameState: newState })
@@ -78,8 +78,11 @@ export interface CreatureFamilyDef {
   levels: CreatureLevelDef[]
 }
 
+// Per-user counter (GameState.nextCreatureId); "c_…" strings in older saves
+export type CreatureId = number | string
+
 export interface GridCreature {
-  id: string            // uuid
+  id: CreatureId
   family: CreatureFamily
   level: number
   lastCollected: number // unix timestamp ms
@@ -171,6 +174,7 @@ export interface GameState {
   dailyQuests: Quest[]
   questLastReset: number
   totalMerges: number
+  nextCreatureId: number             // id for the next creature created
   // Social
   referralCode: string
   referredBy?: number
@@ -179,6 +183,14 @@ export interface GameState {
   subscription: SubscriptionTier
   subscriptionExpires?: number
   noAds: boolean
+  boosters?: ActiveBooster[]         // server-managed, bought via /shop/buy
+}
+
+export interface ActiveBooster {
+  itemId: string
+  start: number                      // ms timestamp
+  end: number
+  multiplier: number
 }
 
 export interface UserProfile {
@@ -196,6 +208,7 @@ export interface ApiResponse<T> {
   ok: boolean
   data?: T
   error?: string
+  status?: number   // HTTP status of a rejected request; unset for network errors
 }
 
 // ─── UI types ─────────────────────────────────────────────────────────────────